@@ -0,0 +1,67 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+from sqlmodel import SQLModel
+from app.config import get_settings
+import app.models  # noqa: F401 - registers tables on SQLModel.metadata
+from app.checkpoints import CHECKPOINT_TABLES
+
+config = context.config
+config.set_main_option("sqlalchemy.url", get_settings().database_url)
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+# Full-text search objects are managed by raw DDL (migrations 0006, 0010) and
+# checkpoint tables by the LangGraph saver (see app/checkpoints.py), not the models
+SEARCH_OBJECTS = {"search_vector", "ix_supply_chain_reports_search_vector"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if reflected and compare_to is None:
+        if name in SEARCH_OBJECTS or name.startswith("report_search"):
+            return False
+        if type_ == "table" and name in CHECKPOINT_TABLES:
+            return False
+        if type_ == "index" and obj.table.name in CHECKPOINT_TABLES:
+            return False
+    return True
+
+
+def run_migrations_offline():
+    """Run migrations in 'offline' mode (emit SQL without a connection)"""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run migrations against the configured database"""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
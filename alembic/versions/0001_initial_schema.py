@@ -0,0 +1,78 @@
+"""Initial schema (tables as created by create_db_and_tables)
+
+Databases created before migrations were introduced already have these
+tables; mark them with ``alembic stamp 0001`` and upgrade from there.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+task_status_enum = sa.Enum("PENDING", "PROCESSING", "COMPLETED", "FAILED", "CANCELLED", name="taskstatusenum")
+task_type_enum = sa.Enum("MANUAL", "SCHEDULED", "RETRY", name="tasktypeenum")
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "supply_chain_reports",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("industry", sa.String(), nullable=False),
+        sa.Column("fragility_score", sa.Integer(), nullable=False),
+        sa.Column("executive_summary", sa.String(), nullable=False),
+        sa.Column("critical_alerts", sa.JSON(), nullable=True),
+        sa.Column("risk_metrics", sa.JSON(), nullable=True),
+        sa.Column("sources", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_supply_chain_reports_industry", "supply_chain_reports", ["industry"])
+
+    op.create_table(
+        "task_statuses",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("task_id", sa.Uuid(), nullable=False),
+        sa.Column("task_type", task_type_enum, nullable=False),
+        sa.Column("industry", sa.String(), nullable=False),
+        sa.Column("status", task_status_enum, nullable=False),
+        sa.Column("progress", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("error_message", sa.String(), nullable=True),
+        sa.Column("retry_count", sa.Integer(), nullable=False),
+        sa.Column("report_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["report_id"], ["supply_chain_reports.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_task_statuses_task_id", "task_statuses", ["task_id"], unique=True)
+    op.create_index("ix_task_statuses_industry", "task_statuses", ["industry"])
+    op.create_index("ix_task_statuses_status", "task_statuses", ["status"])
+
+
+def downgrade():
+    op.drop_table("task_statuses")
+    op.drop_table("supply_chain_reports")
+    op.drop_table("users")
+    task_status_enum.drop(op.get_bind(), checkfirst=True)
+    task_type_enum.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,26 @@
+"""Streamed partial summary and context token counts on task_statuses
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("task_statuses", sa.Column("partial_summary", sa.String(), nullable=True))
+    op.add_column("task_statuses", sa.Column("context_tokens_raw", sa.Integer(), nullable=True))
+    op.add_column("task_statuses", sa.Column("context_tokens_compacted", sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("task_statuses", "context_tokens_compacted")
+    op.drop_column("task_statuses", "context_tokens_raw")
+    op.drop_column("task_statuses", "partial_summary")
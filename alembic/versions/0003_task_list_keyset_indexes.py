@@ -0,0 +1,37 @@
+"""Composite indexes for keyset pagination of the task list
+
+Built CONCURRENTLY on Postgres so large task_statuses tables stay writable.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_task_statuses_status_created_at_id",
+            "task_statuses",
+            ["status", "created_at", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_task_statuses_created_at_id",
+            "task_statuses",
+            ["created_at", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_task_statuses_created_at_id", "task_statuses", postgresql_concurrently=True)
+        op.drop_index("ix_task_statuses_status_created_at_id", "task_statuses", postgresql_concurrently=True)
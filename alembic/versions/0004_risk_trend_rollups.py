@@ -0,0 +1,89 @@
+"""Daily risk trend rollups, backfilled from existing reports
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+"""
+import json
+from collections import defaultdict
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    risk_daily = op.create_table(
+        "industry_risk_daily",
+        sa.Column("industry_key", sa.String(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("industry", sa.String(), nullable=False),
+        sa.Column("report_count", sa.Integer(), nullable=False),
+        sa.Column("fragility_sum", sa.Integer(), nullable=False),
+        sa.Column("fragility_min", sa.Integer(), nullable=False),
+        sa.Column("fragility_max", sa.Integer(), nullable=False),
+        sa.Column("last_report_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("industry_key", "day"),
+    )
+    category_daily = op.create_table(
+        "industry_category_daily",
+        sa.Column("industry_key", sa.String(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("metric_count", sa.Integer(), nullable=False),
+        sa.Column("impact_sum", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("industry_key", "day", "category"),
+    )
+
+    # Backfill: one pass over the existing reports, same normalization as app.analytics
+    reports = sa.table(
+        "supply_chain_reports",
+        sa.column("industry", sa.String()),
+        sa.column("fragility_score", sa.Integer()),
+        sa.column("risk_metrics", sa.JSON()),
+        sa.column("created_at", sa.DateTime()),
+    )
+    risk_rows = {}
+    category_rows = defaultdict(lambda: [0, 0])
+    result = op.get_bind().execute(
+        sa.select(reports.c.industry, reports.c.fragility_score, reports.c.risk_metrics, reports.c.created_at)
+        .order_by(reports.c.created_at)
+    )
+    for industry, score, metrics, created_at in result:
+        key = (industry.strip().lower(), created_at.date())
+        row = risk_rows.setdefault(key, {
+            "industry_key": key[0], "day": key[1], "report_count": 0, "fragility_sum": 0,
+            "fragility_min": score, "fragility_max": score, "last_report_at": created_at,
+        })
+        row["industry"] = industry.strip()
+        row["report_count"] += 1
+        row["fragility_sum"] += score
+        row["fragility_min"] = min(row["fragility_min"], score)
+        row["fragility_max"] = max(row["fragility_max"], score)
+        row["last_report_at"] = created_at
+
+        if isinstance(metrics, str):
+            metrics = json.loads(metrics)
+        for metric in metrics or []:
+            if not metric.get("category"):
+                continue
+            totals = category_rows[key + (" ".join(metric["category"].split()).title(),)]
+            totals[0] += 1
+            totals[1] += int(metric.get("impact_score") or 0)
+
+    if risk_rows:
+        op.bulk_insert(risk_daily, list(risk_rows.values()))
+    if category_rows:
+        op.bulk_insert(category_daily, [
+            {"industry_key": industry_key, "day": day, "category": category, "metric_count": count, "impact_sum": total}
+            for (industry_key, day, category), (count, total) in category_rows.items()
+        ])
+
+
+def downgrade():
+    op.drop_table("industry_category_daily")
+    op.drop_table("industry_risk_daily")
@@ -0,0 +1,107 @@
+"""Normalized risk_metrics / report_sources rows, backfilled from report JSON
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+"""
+import json
+from urllib.parse import urlparse
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def upgrade():
+    risk_metrics = op.create_table(
+        "risk_metrics",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("report_id", sa.Integer(), nullable=False),
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("impact_score", sa.Integer(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["report_id"], ["supply_chain_reports.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_risk_metrics_report_id", "risk_metrics", ["report_id"])
+    op.create_index(
+        "ix_risk_metrics_category_created_at_impact",
+        "risk_metrics",
+        ["category", "created_at", "impact_score"],
+    )
+
+    report_sources = op.create_table(
+        "report_sources",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("report_id", sa.Integer(), nullable=False),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("domain", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["report_id"], ["supply_chain_reports.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_report_sources_report_id", "report_sources", ["report_id"])
+    op.create_index("ix_report_sources_url", "report_sources", ["url"])
+    op.create_index("ix_report_sources_domain_created_at", "report_sources", ["domain", "created_at"])
+
+    # Backfill in id-ordered batches, same normalization as app.reports.report_details
+    reports = sa.table(
+        "supply_chain_reports",
+        sa.column("id", sa.Integer()),
+        sa.column("risk_metrics", sa.JSON()),
+        sa.column("sources", sa.JSON()),
+        sa.column("created_at", sa.DateTime()),
+    )
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(reports.c.id, reports.c.risk_metrics, reports.c.sources, reports.c.created_at)
+            .where(reports.c.id > last_id)
+            .order_by(reports.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        metric_rows, source_rows = [], []
+        for report_id, metrics, sources, created_at in batch:
+            metrics = json.loads(metrics) if isinstance(metrics, str) else metrics
+            sources = json.loads(sources) if isinstance(sources, str) else sources
+            for metric in metrics or []:
+                if not metric.get("category"):
+                    continue
+                metric_rows.append({
+                    "report_id": report_id,
+                    "category": " ".join(metric["category"].split()).title(),
+                    "impact_score": int(metric.get("impact_score") or 0),
+                    "description": metric.get("description") or "",
+                    "created_at": created_at,
+                })
+            for source in sources or []:
+                if not source.get("url"):
+                    continue
+                source_rows.append({
+                    "report_id": report_id,
+                    "url": source["url"],
+                    "domain": (urlparse(source["url"]).hostname or "").lower().removeprefix("www."),
+                    "title": source.get("title"),
+                    "created_at": created_at,
+                })
+        if metric_rows:
+            op.bulk_insert(risk_metrics, metric_rows)
+        if source_rows:
+            op.bulk_insert(report_sources, source_rows)
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    op.drop_table("report_sources")
+    op.drop_table("risk_metrics")
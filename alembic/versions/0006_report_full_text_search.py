@@ -0,0 +1,66 @@
+"""Full-text search over report summaries and alerts
+
+Postgres: generated, weighted tsvector column with a GIN index (built
+CONCURRENTLY). SQLite: external-content FTS5 table kept in sync by triggers.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("""
+            ALTER TABLE supply_chain_reports ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(industry, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(executive_summary, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(critical_alerts::text, '')), 'B')
+            ) STORED
+        """)
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_supply_chain_reports_search_vector "
+                "ON supply_chain_reports USING GIN (search_vector)"
+            )
+    elif dialect == "sqlite":
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS report_search USING fts5(
+                industry, executive_summary, critical_alerts,
+                content='supply_chain_reports', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS report_search_insert AFTER INSERT ON supply_chain_reports BEGIN
+                INSERT INTO report_search(rowid, industry, executive_summary, critical_alerts)
+                VALUES (new.id, new.industry, new.executive_summary, new.critical_alerts);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS report_search_delete AFTER DELETE ON supply_chain_reports BEGIN
+                INSERT INTO report_search(report_search, rowid, industry, executive_summary, critical_alerts)
+                VALUES ('delete', old.id, old.industry, old.executive_summary, old.critical_alerts);
+            END
+        """)
+        op.execute("INSERT INTO report_search(report_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_supply_chain_reports_search_vector")
+        op.execute("ALTER TABLE supply_chain_reports DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS report_search_delete")
+        op.execute("DROP TRIGGER IF EXISTS report_search_insert")
+        op.execute("DROP TABLE IF EXISTS report_search")
@@ -0,0 +1,99 @@
+"""Int8 report embeddings for similarity search, backfilled from existing reports
+
+The backfill uses a frozen copy of the hashing vectorizer from
+app/similarity.py as of this revision (model "hashing-uni-bigram-v1"), so
+later changes to the application code don't change what this migration
+writes; rows record the model name.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16
+"""
+import hashlib
+import json
+import re
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+EMBEDDING_MODEL = "hashing-uni-bigram-v1"
+EMBEDDING_DIM = 512
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from has have in into is it its of on or that the their "
+    "there these this to was were will with which while within than over under across more most".split()
+)
+
+
+def embed_text(text):
+    tokens = [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+    counts = {}
+    for feature in tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]:
+        counts[feature] = counts.get(feature, 0) + 1
+
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature, count in counts.items():
+        value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+        vector[value % EMBEDDING_DIM] += (1.0 if (value >> 63) & 1 else -1.0) * (1.0 + np.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def quantize(vector):
+    return np.clip(np.rint(vector * 127), -127, 127).astype(np.int8).tobytes()
+
+
+def upgrade():
+    report_embeddings = op.create_table(
+        "report_embeddings",
+        sa.Column("report_id", sa.Integer(), nullable=False),
+        sa.Column("industry", sa.String(), nullable=False),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["report_id"], ["supply_chain_reports.id"]),
+        sa.PrimaryKeyConstraint("report_id"),
+    )
+
+    reports = sa.table(
+        "supply_chain_reports",
+        sa.column("id", sa.Integer()),
+        sa.column("industry", sa.String()),
+        sa.column("executive_summary", sa.String()),
+        sa.column("critical_alerts", sa.JSON()),
+        sa.column("created_at", sa.DateTime()),
+    )
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(reports)
+            .where(reports.c.id > last_id)
+            .order_by(reports.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        rows = []
+        for report_id, industry, summary, alerts, created_at in batch:
+            alerts = json.loads(alerts) if isinstance(alerts, str) else alerts
+            rows.append({
+                "report_id": report_id,
+                "industry": industry,
+                "model": EMBEDDING_MODEL,
+                "vector": quantize(embed_text("\n".join([industry, summary, *(alerts or [])]))),
+                "created_at": created_at,
+            })
+        op.bulk_insert(report_embeddings, rows)
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    op.drop_table("report_embeddings")
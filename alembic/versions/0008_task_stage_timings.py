@@ -0,0 +1,32 @@
+"""Per-stage timing breakdown on task_statuses
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+STAGE_COLUMNS = ["researcher_seconds", "compactor_seconds", "analyst_seconds", "save_seconds"]
+
+
+def upgrade():
+    for column in STAGE_COLUMNS:
+        op.add_column("task_statuses", sa.Column(column, sa.Float(), nullable=True))
+    op.add_column("task_statuses", sa.Column("slowest_stage", sa.String(), nullable=True))
+    op.add_column("task_statuses", sa.Column("slowest_stage_seconds", sa.Float(), nullable=True))
+    op.create_index("ix_task_statuses_slowest_stage_seconds", "task_statuses", ["slowest_stage_seconds"])
+
+
+def downgrade():
+    op.drop_index("ix_task_statuses_slowest_stage_seconds", table_name="task_statuses")
+    op.drop_column("task_statuses", "slowest_stage_seconds")
+    op.drop_column("task_statuses", "slowest_stage")
+    for column in reversed(STAGE_COLUMNS):
+        op.drop_column("task_statuses", column)
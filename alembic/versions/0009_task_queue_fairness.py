@@ -0,0 +1,38 @@
+"""Requesting user and dispatch time on task_statuses (fair-share queueing)
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("task_statuses") as batch_op:
+        batch_op.add_column(sa.Column("user_id", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("dispatched_at", sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key("fk_task_statuses_user_id_users", "users", ["user_id"], ["id"])
+    op.create_index("ix_task_statuses_user_id", "task_statuses", ["user_id"])
+    op.create_index(
+        "ix_task_statuses_task_type_status_completed_at",
+        "task_statuses",
+        ["task_type", "status", "completed_at"]
+    )
+    # Existing tasks were all sent to the broker when created; none are held
+    op.execute("UPDATE task_statuses SET dispatched_at = created_at")
+
+
+def downgrade():
+    op.drop_index("ix_task_statuses_task_type_status_completed_at", table_name="task_statuses")
+    op.drop_index("ix_task_statuses_user_id", table_name="task_statuses")
+    with op.batch_alter_table("task_statuses") as batch_op:
+        batch_op.drop_constraint("fk_task_statuses_user_id_users", type_="foreignkey")
+        batch_op.drop_column("dispatched_at")
+        batch_op.drop_column("user_id")
@@ -0,0 +1,34 @@
+"""Keep the SQLite full-text index in sync when reports are edited
+
+Postgres needs nothing: its search_vector column is generated.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-16
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS report_search_update AFTER UPDATE ON supply_chain_reports BEGIN
+                INSERT INTO report_search(report_search, rowid, industry, executive_summary, critical_alerts)
+                VALUES ('delete', old.id, old.industry, old.executive_summary, old.critical_alerts);
+                INSERT INTO report_search(rowid, industry, executive_summary, critical_alerts)
+                VALUES (new.id, new.industry, new.executive_summary, new.critical_alerts);
+            END
+        """)
+        # Reports edited before the trigger existed
+        op.execute("INSERT INTO report_search(report_search) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS report_search_update")
@@ -1,5 +1,13 @@
-from sqladmin import ModelView
-from app.models import User, TaskStatus, SupplyChainReport
+import asyncio
+from fastapi.templating import Jinja2Templates
+from sqladmin import ModelView, action
+from sqlmodel import Session, select
+from starlette.requests import Request
+from app.database import engine
+from app.auth import invalidate_user
+from app.models import User, TaskStatus, SupplyChainReport, IndustryRiskDaily
+
+templates = Jinja2Templates(directory="app/templates")
 
 
 class UserAdmin(ModelView, model=User):
@@ -17,6 +25,13 @@ class UserAdmin(ModelView, model=User):
     name = "User"
     name_plural = "Users"
     icon = "fa-solid fa-user"
+    
+    async def after_model_change(self, data, model, is_created, request):
+        """Drop cached sessions (in every web process) so is_active changes apply immediately"""
+        await invalidate_user(model.id)
+    
+    async def after_model_delete(self, model, request):
+        await invalidate_user(model.id)
 
 
 class TaskStatusAdmin(ModelView, model=TaskStatus):
@@ -28,22 +43,62 @@ class TaskStatusAdmin(ModelView, model=TaskStatus):
         TaskStatus.status,
         TaskStatus.progress,
         TaskStatus.task_type,
-        TaskStatus.created_at
+        TaskStatus.user_id,
+        TaskStatus.retry_count,
+        TaskStatus.context_tokens_raw,
+        TaskStatus.context_tokens_compacted,
+        TaskStatus.slowest_stage,
+        TaskStatus.slowest_stage_seconds,
+        TaskStatus.created_at,
+        TaskStatus.dispatched_at
     ]
     column_searchable_list = [TaskStatus.industry]
     column_sortable_list = [
         TaskStatus.id,
         TaskStatus.status,
         TaskStatus.progress,
+        TaskStatus.slowest_stage_seconds,
+        TaskStatus.researcher_seconds,
+        TaskStatus.compactor_seconds,
+        TaskStatus.analyst_seconds,
+        TaskStatus.save_seconds,
         TaskStatus.created_at
     ]
     column_default_sort = [(TaskStatus.created_at, True)]
-    column_filters = [TaskStatus.status, TaskStatus.task_type]
+    column_filters = [TaskStatus.status, TaskStatus.task_type, TaskStatus.slowest_stage]
     
     # Metadata
     name = "Task"
     name_plural = "Tasks"
     icon = "fa-solid fa-tasks"
+    
+    @action(name="checkpoints", label="Inspect checkpoints", add_in_list=True, add_in_detail=True)
+    async def inspect_checkpoints(self, request: Request):
+        """Show the LangGraph checkpoints recorded for the selected tasks"""
+        pks = [int(pk) for pk in request.query_params.get("pks", "").split(",") if pk]
+        tasks = await asyncio.to_thread(_load_checkpoints, pks)
+        return templates.TemplateResponse(
+            "admin/checkpoints.html",
+            {"request": request, "tasks": tasks, "back_url": request.url_for("admin:list", identity=self.identity)}
+        )
+
+
+def _load_checkpoints(pks: list) -> list:
+    from app.checkpoints import checkpoint_history
+    
+    with Session(engine) as session:
+        rows = session.exec(select(TaskStatus).where(TaskStatus.id.in_(pks))).all()
+    return [
+        {
+            "task_id": str(task.task_id),
+            "industry": task.industry,
+            "status": task.status.value,
+            "retry_count": task.retry_count,
+            "error_message": task.error_message,
+            "history": checkpoint_history(task.task_id)
+        }
+        for task in rows
+    ]
 
 
 class ReportAdmin(ModelView, model=SupplyChainReport):
@@ -57,13 +112,49 @@ class ReportAdmin(ModelView, model=SupplyChainReport):
     column_searchable_list = [SupplyChainReport.industry]
     column_sortable_list = [
         SupplyChainReport.id,
+        SupplyChainReport.industry,
         SupplyChainReport.fragility_score,
         SupplyChainReport.created_at
     ]
     column_default_sort = [(SupplyChainReport.created_at, True)]
     column_details_exclude_list = [SupplyChainReport.critical_alerts]
     
+    # Reports are write-once: their cached HTML, ETags, normalized rows, rollups
+    # and embeddings are built when a research task saves them
+    can_create = False
+    can_edit = False
+    
     # Metadata
     name = "Report"
     name_plural = "Reports"
     icon = "fa-solid fa-file-alt"
+
+
+class IndustryRiskDailyAdmin(ModelView, model=IndustryRiskDaily):
+    """Read-only admin view of the daily fragility rollups"""
+    column_list = [
+        IndustryRiskDaily.industry,
+        IndustryRiskDaily.day,
+        IndustryRiskDaily.report_count,
+        IndustryRiskDaily.fragility_min,
+        IndustryRiskDaily.fragility_max,
+        IndustryRiskDaily.last_report_at
+    ]
+    column_searchable_list = [IndustryRiskDaily.industry]
+    column_sortable_list = [
+        IndustryRiskDaily.industry,
+        IndustryRiskDaily.day,
+        IndustryRiskDaily.report_count,
+        IndustryRiskDaily.fragility_max
+    ]
+    column_default_sort = [(IndustryRiskDaily.day, True)]
+    
+    # Maintained by the research tasks
+    can_create = False
+    can_edit = False
+    can_delete = False
+    
+    # Metadata
+    name = "Daily Risk"
+    name_plural = "Daily Risk"
+    icon = "fa-solid fa-chart-line"
@@ -1,21 +1,135 @@
-from typing import TypedDict, List
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import TypedDict, List, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
 from pydantic import BaseModel, Field
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.output_parsers import JsonOutputParser
 from langgraph.graph import StateGraph, START, END
-from langchain_google_genai import ChatGoogleGenerativeAI
-from tavily import TavilyClient
+from langgraph.types import StreamWriter
+from langgraph.utils.runnable import RunnableCallable
+from app.cache import SharedCache, StaleWhileRevalidateCache
+from app.compaction import compact_documents
 from app.config import get_settings
+from app.metrics import NODE_SECONDS, TAVILY_REQUEST_SECONDS, TAVILY_RESULTS, record_llm_tokens
+from app.providers import cache_scope, get_async_search_client, get_chat_model, get_search_client
 
 settings = get_settings()
 
-# Initialize clients
-tavily = TavilyClient(api_key=settings.tavily_api_key)
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash-exp",
-    temperature=0,
-    google_api_key=settings.google_api_key
+# Compiled graphs are built on first use and reused by the process
+_build_lock = threading.Lock()
+_async_build_lock = asyncio.Lock()
+
+
+# Search results are shared across runs (and worker processes via Redis)
+search_cache = StaleWhileRevalidateCache(
+    "tavily-search",
+    fresh_seconds=settings.search_cache_ttl_seconds,
+    stale_seconds=settings.search_cache_stale_seconds,
+    max_local_entries=settings.search_cache_max_entries
+)
+
+
+# Structured analyst output, content-addressed by model + prompt + research text
+analyst_cache = SharedCache(
+    "analyst-output",
+    ttl_seconds=settings.analyst_cache_ttl_seconds,
+    max_local_entries=settings.analyst_cache_max_entries
 )
 
 
+def timed_node(node: str):
+    """Observe a node's wall time (sync or async); the node's signature is preserved"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with NODE_SECONDS.labels(node).time():
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with NODE_SECONDS.labels(node).time():
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Counts analyst tokens from the usage metadata of finished LLM calls"""
+
+    run_inline = True
+
+    def on_llm_end(self, response, **kwargs):
+        model = getattr(get_chat_model(), "model", "unknown")
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    record_llm_tokens(model, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+
+# Passed as the analyst calls' callbacks
+llm_config = {"callbacks": [TokenUsageHandler()]}
+
+
+def _observe_search(start: float, result: Optional[dict]):
+    """Record a Tavily call's latency and result count (result None: it failed)"""
+    TAVILY_REQUEST_SECONDS.labels("error" if result is None else "ok").observe(time.perf_counter() - start)
+    if result is not None:
+        TAVILY_RESULTS.observe(len(result.get("results") or []))
+
+
+def _search(client, query: str, params: dict) -> dict:
+    start = time.perf_counter()
+    result = None
+    try:
+        result = client.search(query=query, **params)
+        return result
+    finally:
+        _observe_search(start, result)
+
+
+async def _asearch(client, query: str, params: dict) -> dict:
+    start = time.perf_counter()
+    result = None
+    try:
+        result = await client.search(query=query, **params)
+        return result
+    finally:
+        _observe_search(start, result)
+
+
+def cached_search(query: str, **params) -> dict:
+    """
+    Run a Tavily search through the shared cache
+
+    Returns the Tavily response with a ``retrieved_at`` ISO timestamp recording
+    when the results were actually fetched from the network.
+    """
+    client = get_search_client()
+    key = search_cache.make_key(query, params, *cache_scope(client))
+    entry = search_cache.get_or_load(key, lambda: _search(client, query, params))
+    retrieved_at = datetime.fromtimestamp(entry["fetched_at"], tz=timezone.utc).isoformat()
+    return {**entry["value"], "retrieved_at": retrieved_at}
+
+
+async def acached_search(query: str, **params) -> dict:
+    """Async cached_search, using the async Tavily client on a miss"""
+    client = get_async_search_client()
+    key = search_cache.make_key(query, params, *cache_scope(client))
+    entry = await search_cache.aget_or_load(key, lambda: _asearch(client, query, params))
+    retrieved_at = datetime.fromtimestamp(entry["fetched_at"], tz=timezone.utc).isoformat()
+    return {**entry["value"], "retrieved_at": retrieved_at}
+
+
 class Source(BaseModel):
     url: str = Field(description="URL of the source article")
     title: str = Field(description="Title of the source article")
@@ -23,8 +137,11 @@ class Source(BaseModel):
 
 class AgentState(TypedDict):
     industry: str
+    documents: List[dict]
     raw_data: List[str]
     sources: List[dict]
+    context_tokens_raw: int
+    context_tokens_compacted: int
     risk_report: str
     critical_alerts: List[str]
     fragility_score: int
@@ -32,7 +149,7 @@ class AgentState(TypedDict):
 
 
 class RiskMetric(BaseModel):
-    category: str = Field(description="e.g., Logistics, Labor, Geopolitical")
+    category: str = Field(description="e.g., Logistics, Labor, Geopolitical, Raw Materials")
     impact_score: int = Field(description="Scale of 1-10")
     description: str = Field(description="Brief explanation of the risk")
 
@@ -45,38 +162,204 @@ class AnalystOutput(BaseModel):
     sources: List[Source] = Field(description="List of source articles used in the analysis")
 
 
-def researcher_node(state):
+# The analyst answers in JSON text rather than a tool call: Gemini returns tool
+# calls whole, while text streams, so the parser can yield growing partial output
+analyst_parser = JsonOutputParser(pydantic_object=AnalystOutput)
+
+
+# Focused sub-queries issued concurrently by the researcher node
+RESEARCH_TOPICS: Dict[str, str] = {
+    "logistics": "recent shipping delays, port congestion and port strikes affecting the {industry} industry {year}",
+    "labor": "recent labor strikes and workforce shortages in the {industry} supply chain {year}",
+    "geopolitical": "tariffs, sanctions and geopolitical risks to {industry} supply chains {year}",
+    "raw_materials": "raw material and component shortages in the {industry} industry {year}",
+}
+
+_search_executor = ThreadPoolExecutor(
+    max_workers=settings.research_max_parallel_queries,
+    thread_name_prefix="tavily-search"
+)
+
+
+def _normalize_url(url: str) -> str:
+    """Normalize a URL for deduplication (drop fragment and trailing slash)"""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, ""))
+
+
+def merge_search_results(results_by_topic: Dict[str, dict]) -> List[dict]:
+    """
+    Merge sub-query results, keeping the best-scoring hit per URL
+
+    The order is independent of which sub-query finished first, so identical
+    search results always produce identical analyst input (and cache keys).
+    """
+    merged: Dict[str, dict] = {}
+    for topic in sorted(results_by_topic):
+        search_result = results_by_topic[topic]
+        for r in search_result["results"]:
+            key = _normalize_url(r["url"])
+            hit = {**r, "topic": topic, "retrieved_at": search_result["retrieved_at"]}
+            if key not in merged or hit.get("score", 0) > merged[key].get("score", 0):
+                merged[key] = hit
+    return sorted(merged.values(), key=lambda r: (-r.get("score", 0), _normalize_url(r["url"])))
+
+
+def _no_writer(_):
+    """Stand-in stream writer for nodes called outside a streamed graph run"""
+
+
+def _research_queries(industry: str) -> Dict[str, str]:
+    """The researcher's sub-query for each topic"""
+    year = datetime.utcnow().year
+    return {
+        topic: template.format(industry=industry, year=year)
+        for topic, template in RESEARCH_TOPICS.items()
+    }
+
+
+def _search_params() -> dict:
+    return {"topic": "news", "search_depth": "advanced", "max_results": settings.research_results_per_query}
+
+
+def _started_search(started: Dict[str, float], topic: str, query: str) -> dict:
+    """Run a sub-query on a search thread, recording when it actually started"""
+    started[topic] = time.monotonic()
+    return cached_search(query, **_search_params())
+
+
+@timed_node("researcher")
+def researcher_node(state, writer: StreamWriter = _no_writer):
     """Search for recent supply chain disruptions based on the industry"""
     industry = state.get("industry", "Global")
-    query = f"recent supply chain disruptions, port strikes, and logistics risks in {industry} industry 2025"
+    queries = _research_queries(industry)
 
-    print(f"--- AGENT RESEARCHING: {query} ---")
+    print(f"--- AGENT RESEARCHING: {industry} ({len(queries)} sub-queries) ---")
 
-    search_result = tavily.search(
-        query=query, 
-        topic="news", 
-        search_depth="advanced",
-        max_results=5
-    )
+    started: Dict[str, float] = {}
+    futures = {
+        _search_executor.submit(_started_search, started, topic, query): topic
+        for topic, query in queries.items()
+    }
+
+    # Wall time is bounded by the slowest sub-query (or the timeout), not the sum.
+    # Each timeout runs from when a search thread picks the query up, so queries
+    # queued behind a batch's other industries aren't dropped before they're sent.
+    timeout = settings.research_query_timeout_seconds
+    results_by_topic = {}
+    finished = 0
+    pending = set(futures)
+    while pending:
+        now = time.monotonic()
+        for future in [f for f in pending if now - started.get(futures[f], now) >= timeout]:
+            pending.discard(future)
+            future.cancel()
+            print(f"--- SUB-QUERY TIMED OUT ({futures[future]}) ---")
+        if not pending:
+            break
+
+        # Wake for the next deadline, or at least every second to see newly started queries
+        deadlines = [started[futures[f]] + timeout - now for f in pending if futures[f] in started]
+        done, pending = wait(pending, timeout=min([1.0] + deadlines), return_when=FIRST_COMPLETED)
+        for future in done:
+            topic = futures[future]
+            finished += 1
+            try:
+                results_by_topic[topic] = future.result()
+            except Exception as exc:
+                print(f"--- SUB-QUERY FAILED ({topic}): {exc} ---")
+            writer({"stage": "researcher", "completed": finished, "total": len(futures)})
+
+    return _research_update(industry, results_by_topic)
+
+
+@timed_node("researcher")
+async def aresearcher_node(state, writer: StreamWriter = _no_writer):
+    """Async researcher: sub-queries run as tasks on the event loop"""
+    industry = state.get("industry", "Global")
+    queries = _research_queries(industry)
+
+    print(f"--- AGENT RESEARCHING: {industry} ({len(queries)} sub-queries, async) ---")
+
+    async def search(topic: str, query: str):
+        try:
+            return topic, await acached_search(query, **_search_params())
+        except Exception as exc:
+            print(f"--- SUB-QUERY FAILED ({topic}): {exc} ---")
+            return topic, None
+
+    tasks = [asyncio.ensure_future(search(topic, query)) for topic, query in queries.items()]
+
+    # As in the sync node, wall time is bounded by the slowest sub-query or the timeout
+    results_by_topic = {}
+    finished = 0
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=settings.research_query_timeout_seconds):
+            topic, result = await next_done
+            finished += 1
+            if result is not None:
+                results_by_topic[topic] = result
+            writer({"stage": "researcher", "completed": finished, "total": len(tasks)})
+    except asyncio.TimeoutError:
+        for task, topic in zip(tasks, queries):
+            if not task.done():
+                task.cancel()
+                print(f"--- SUB-QUERY TIMED OUT ({topic}) ---")
+
+    return _research_update(industry, results_by_topic)
+
+
+def _research_update(industry: str, results_by_topic: Dict[str, dict]) -> dict:
+    """Merge sub-query results into the researcher's state update"""
+    if not results_by_topic:
+        raise RuntimeError(f"All research sub-queries failed for {industry}")
+
+    results = merge_search_results(results_by_topic)
 
     raw_data = [
-        f"Source: {r['url']}\nContent: {r['content']}" 
-        for r in search_result['results']
+        f"Source: {r['url']}\nTopic: {r['topic']}\nContent: {r['content']}" 
+        for r in results
     ]
     
     sources = [
         {
             'url': r['url'],
-            'title': r.get('title', r['url'])
+            'title': r.get('title', r['url']),
+            'retrieved_at': r['retrieved_at']
         }
-        for r in search_result['results']
+        for r in results
     ]
 
-    return {"raw_data": raw_data, "sources": sources}
+    documents = [
+        {'url': r['url'], 'topic': r['topic'], 'content': r['content'], 'score': r.get('score', 0)}
+        for r in results
+    ]
+
+    return {"documents": documents, "raw_data": raw_data, "sources": sources}
+
+
+@timed_node("compactor")
+def compactor_node(state):
+    """Deduplicate, strip and pack search content into the analyst token budget"""
+    compacted = compact_documents(
+        state["documents"],
+        industry=state["industry"],
+        token_budget=settings.analyst_context_token_budget
+    )
+    print(
+        f"--- CONTEXT COMPACTED: {compacted['context_tokens_raw']} -> "
+        f"{compacted['context_tokens_compacted']} tokens ---"
+    )
+    return compacted
+
+
+async def acompactor_node(state):
+    """Compaction is CPU-bound, so keep it off the event loop"""
+    return await asyncio.to_thread(compactor_node, state)
 
 
-def risk_analyst_node(state):
-    """Analyze research data and generate risk report"""
+def build_analyst_messages(state) -> List[dict]:
+    """Build the analyst prompt for a research state"""
     raw_text = "\n\n".join(state["raw_data"])
     industry = state["industry"]
     
@@ -87,33 +370,244 @@ def risk_analyst_node(state):
     Your goal:
     1. Identify specific disruptions (strikes, shortages, delays).
     2. Quantify the 'Fragility Score' (1-10).
-    3. Categorize risks into Logistics, Labor, or Geopolitical.
+    3. Categorize risks into Logistics, Labor, Geopolitical, or Raw Materials.
     4. Provide a punchy Executive Summary.
-    """
 
-    structured_llm = llm.with_structured_output(AnalystOutput)
+    Write the executive summary first and respond with the JSON object only.
+    {analyst_parser.get_format_instructions()}
+    """
 
-    analysis = structured_llm.invoke([
+    return [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": raw_text}
-    ])
+    ]
+
 
+def analyst_cache_key(messages: List[dict]) -> str:
+    """Hash of everything that determines the analyst's output"""
+    schema = AnalystOutput.model_json_schema()
+    payload = json.dumps([getattr(get_chat_model(), "model", ""), schema, messages], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cached_analysis(key: str):
+    """Previously generated analysis for this input, if still cached"""
+    cached = analyst_cache.get(key)
+    if cached is None:
+        return None
+    try:
+        return AnalystOutput.model_validate(cached)
+    except ValueError:
+        analyst_cache.delete(key)
+        return None
+
+
+async def acached_analysis(key: str):
+    """Async cached_analysis (an invalid entry is simply overwritten later)"""
+    cached = await analyst_cache.aget(key)
+    if cached is None:
+        return None
+    try:
+        return AnalystOutput.model_validate(cached)
+    except ValueError:
+        return None
+
+
+def analysis_to_state(analysis: AnalystOutput, state) -> dict:
+    """Convert the structured analyst output into graph state updates"""
     return {
         "risk_report": analysis.executive_summary,
         "fragility_score": analysis.fragility_score,
         "critical_alerts": analysis.critical_alerts,
         "risk_metrics": [m.model_dump() for m in analysis.risk_metrics],
-        "sources": [s.model_dump() for s in analysis.sources]
+        "sources": _with_provenance([s.model_dump() for s in analysis.sources], state.get("sources", []))
     }
 
 
-# Build the graph
-workflow = StateGraph(AgentState)
-workflow.add_node("researcher", researcher_node)
-workflow.add_node("analyst", risk_analyst_node)
+@timed_node("analyst")
+def risk_analyst_node(state, writer: StreamWriter = _no_writer):
+    """Analyze research data and generate risk report, streaming partial output"""
+    messages = build_analyst_messages(state)
+    cache_key = analyst_cache_key(messages)
+    analysis = cached_analysis(cache_key)
+    if analysis is not None:
+        print(f"--- ANALYST CACHE HIT: {state['industry']} ---")
+        writer({"stage": "analyst", "generated_chars": len(analysis.model_dump_json()), "summary": analysis.executive_summary})
+        return analysis_to_state(analysis, state)
+
+    for chunk in analyst_parser.transform(get_chat_model().stream(messages, config=llm_config)):
+        analysis = chunk
+        _write_partial(chunk, writer)
+
+    analysis = _final_analysis(analysis)
+    analyst_cache.set(cache_key, analysis.model_dump())
+    return analysis_to_state(analysis, state)
+
+
+@timed_node("analyst")
+async def arisk_analyst_node(state, writer: StreamWriter = _no_writer):
+    """Async analyst: streams the JSON output with astream"""
+    messages = build_analyst_messages(state)
+    cache_key = analyst_cache_key(messages)
+    analysis = await acached_analysis(cache_key)
+    if analysis is not None:
+        print(f"--- ANALYST CACHE HIT: {state['industry']} ---")
+        writer({"stage": "analyst", "generated_chars": len(analysis.model_dump_json()), "summary": analysis.executive_summary})
+        return analysis_to_state(analysis, state)
+
+    async for chunk in analyst_parser.atransform(get_chat_model().astream(messages, config=llm_config)):
+        analysis = chunk
+        _write_partial(chunk, writer)
+
+    analysis = _final_analysis(analysis)
+    await analyst_cache.aset(cache_key, analysis.model_dump())
+    return analysis_to_state(analysis, state)
+
+
+def _write_partial(chunk, writer: StreamWriter):
+    """Stream the size and summary of a partial analyst output"""
+    summary = chunk.get("executive_summary") or ""
+    generated = len(json.dumps(chunk))
+    writer({"stage": "analyst", "generated_chars": generated, "summary": summary})
+
+
+def _final_analysis(analysis) -> AnalystOutput:
+    """Validate the last streamed chunk as the complete analyst output"""
+    if analysis is None:
+        raise RuntimeError("Analyst returned no output")
+    return AnalystOutput.model_validate(analysis)
+
+
+def _with_provenance(sources: List[dict], searched: List[dict]) -> List[dict]:
+    """Carry search retrieval timestamps over to the analyst's cited sources"""
+    retrieved = {s['url']: s.get('retrieved_at') for s in searched}
+    return [
+        {**source, 'retrieved_at': retrieved[source['url']]} if retrieved.get(source['url']) else source
+        for source in sources
+    ]
+
+
+def build_workflow() -> StateGraph:
+    """The research graph, uncompiled"""
+    workflow = StateGraph(AgentState)
+    # Each node has a sync and an async implementation: invoke/stream use the
+    # former, ainvoke/astream (the worker's event loop) the latter
+    workflow.add_node("researcher", RunnableCallable(researcher_node, aresearcher_node, name="researcher", trace=False))
+    workflow.add_node("compactor", RunnableCallable(compactor_node, acompactor_node, name="compactor", trace=False))
+    workflow.add_node("analyst", RunnableCallable(risk_analyst_node, arisk_analyst_node, name="analyst", trace=False))
+
+    workflow.add_edge(START, "researcher")
+    workflow.add_edge("researcher", "compactor")
+    workflow.add_edge("compactor", "analyst")
+    workflow.add_edge("analyst", END)
+    return workflow
+
+
+_supply_chain_app = None
+_research_app = None
+
+
+def get_supply_chain_app():
+    """The graph compiled without a checkpointer (one-off runs)"""
+    global _supply_chain_app
+    with _build_lock:
+        if _supply_chain_app is None:
+            _supply_chain_app = build_workflow().compile()
+        return _supply_chain_app
+
+
+def get_research_app():
+    """The graph compiled with the persistent checkpointer (thread_id = task_id)"""
+    global _research_app
+    with _build_lock:
+        if _research_app is None:
+            from app.checkpoints import get_checkpointer
+            _research_app = build_workflow().compile(checkpointer=get_checkpointer())
+        return _research_app
+
+
+_async_research_app = None
+
+
+async def get_async_research_app():
+    """The graph compiled with the async checkpointer, for the worker's event loop"""
+    global _async_research_app
+    async with _async_build_lock:
+        if _async_research_app is None:
+            from app.checkpoints import get_async_checkpointer
+            _async_research_app = build_workflow().compile(checkpointer=await get_async_checkpointer())
+        return _async_research_app
+
+
+def initial_state(industry: str) -> AgentState:
+    """Empty graph state for an industry"""
+    return {
+        "industry": industry,
+        "documents": [],
+        "raw_data": [],
+        "sources": [],
+        "context_tokens_raw": 0,
+        "context_tokens_compacted": 0,
+        "risk_report": "",
+        "critical_alerts": [],
+        "fragility_score": 0,
+        "risk_metrics": []
+    }
+
+
+def run_batch(industries: List[str]) -> List[object]:
+    """
+    Research and analyze several industries in one pass
+
+    Each distinct industry (case-insensitive) is researched and compacted once, concurrently;
+    overlapping sub-queries are shared through the search cache. Analyst
+    calls not answered by the analyst cache go out as a single LLM batch. Returns one final state per input
+    industry, or the exception that industry failed with.
+    """
+    unique = {}
+    for industry in industries:
+        unique.setdefault(industry.strip().lower(), industry)
+
+    states = {key: initial_state(industry) for key, industry in unique.items()}
+    with ThreadPoolExecutor(max_workers=min(len(states), settings.research_batch_size) or 1) as executor:
+        researched = dict(zip(states, executor.map(_research_or_error, states.values())))
+
+    # Cached analyses are applied directly; only the rest go out in the LLM batch
+    ready = {}
+    for key, state in researched.items():
+        if isinstance(state, Exception):
+            continue
+        messages = build_analyst_messages(state)
+        cache_key = analyst_cache_key(messages)
+        analysis = cached_analysis(cache_key)
+        if analysis is not None:
+            researched[key] = {**state, **analysis_to_state(analysis, state)}
+        else:
+            ready[key] = (state, messages, cache_key)
+
+    if ready:
+        responses = get_chat_model().batch(
+            [messages for _, messages, _ in ready.values()],
+            config=llm_config,
+            return_exceptions=True
+        )
+        for (key, (state, _, cache_key)), response in zip(ready.items(), responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                analysis = AnalystOutput.model_validate(analyst_parser.invoke(response))
+            except Exception as exc:
+                researched[key] = exc
+                continue
+            analyst_cache.set(cache_key, analysis.model_dump())
+            researched[key] = {**state, **analysis_to_state(analysis, state)}
+
+    return [researched[industry.strip().lower()] for industry in industries]
 
-workflow.add_edge(START, "researcher")
-workflow.add_edge("researcher", "analyst")
-workflow.add_edge("analyst", END)
 
-supply_chain_app = workflow.compile()
+def _research_or_error(state):
+    try:
+        state = {**state, **researcher_node(state)}
+        return {**state, **compactor_node(state)}
+    except Exception as exc:
+        return exc
@@ -0,0 +1,205 @@
+"""
+Historical risk trends
+
+Every saved report is folded into two daily rollup tables (per industry, and
+per industry and risk category) in the same transaction that inserts it.
+Trend charts read only these rollups, never the reports' JSON columns.
+"""
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import get_settings
+from app.models import IndustryCategoryDaily, IndustryRiskDaily, SupplyChainReport
+from app.reports import normalize_category
+
+settings = get_settings()
+
+CHART_WIDTH = 640
+CHART_HEIGHT = 200
+CATEGORY_COLORS = ["#3b82f6", "#ef4444", "#10b981", "#f59e0b", "#8b5cf6", "#ec4899", "#14b8a6", "#6b7280"]
+
+
+def normalize_industry(industry: str) -> str:
+    return industry.strip().lower()
+
+
+def _upsert(session: Session, table):
+    """Dialect-specific INSERT supporting ON CONFLICT DO UPDATE"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Rollup upserts are not implemented for {dialect}")
+    return insert(table)
+
+
+def record_report(session: Session, report: SupplyChainReport):
+    """Fold a new report into the daily rollups (call inside the report's transaction)"""
+    industry_key = normalize_industry(report.industry)
+    day = report.created_at.date()
+    score = report.fragility_score
+
+    risk = IndustryRiskDaily.__table__
+    statement = _upsert(session, risk).values(
+        industry_key=industry_key,
+        day=day,
+        industry=report.industry.strip(),
+        report_count=1,
+        fragility_sum=score,
+        fragility_min=score,
+        fragility_max=score,
+        last_report_at=report.created_at
+    )
+    new = statement.excluded
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[risk.c.industry_key, risk.c.day],
+        set_={
+            "industry": new.industry,
+            "report_count": risk.c.report_count + 1,
+            "fragility_sum": risk.c.fragility_sum + new.fragility_sum,
+            "fragility_min": case((new.fragility_min < risk.c.fragility_min, new.fragility_min), else_=risk.c.fragility_min),
+            "fragility_max": case((new.fragility_max > risk.c.fragility_max, new.fragility_max), else_=risk.c.fragility_max),
+            "last_report_at": case((new.last_report_at > risk.c.last_report_at, new.last_report_at), else_=risk.c.last_report_at)
+        }
+    ))
+
+    # One row per category; a report naming a category twice counts both metrics
+    categories: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    for metric in report.risk_metrics or []:
+        if not metric.get("category"):
+            continue
+        totals = categories[normalize_category(metric["category"])]
+        totals[0] += 1
+        totals[1] += int(metric.get("impact_score") or 0)
+    if not categories:
+        return
+
+    category = IndustryCategoryDaily.__table__
+    statement = _upsert(session, category).values([
+        {"industry_key": industry_key, "day": day, "category": name, "metric_count": count, "impact_sum": total}
+        for name, (count, total) in categories.items()
+    ])
+    new = statement.excluded
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[category.c.industry_key, category.c.day, category.c.category],
+        set_={
+            "metric_count": category.c.metric_count + new.metric_count,
+            "impact_sum": category.c.impact_sum + new.impact_sum
+        }
+    ))
+
+
+async def list_industries(session: AsyncSession) -> List[dict]:
+    """Industries with trend data, most recently reported first"""
+    statement = (
+        select(IndustryRiskDaily.industry_key, IndustryRiskDaily.industry)
+        .order_by(IndustryRiskDaily.last_report_at.desc())
+    )
+    industries = {}
+    for industry_key, industry in (await session.exec(statement)).all():
+        industries.setdefault(industry_key, industry)
+    return [{"key": key, "name": name} for key, name in industries.items()]
+
+
+def rolling_average(rows: List[IndustryRiskDaily], window_days: int) -> List[Tuple[date, float]]:
+    """Report-weighted average fragility over the trailing window ending on each day"""
+    window: deque = deque()
+    count = total = 0
+    averages = []
+    for row in rows:
+        window.append(row)
+        count += row.report_count
+        total += row.fragility_sum
+        while window[0].day <= row.day - timedelta(days=window_days):
+            expired = window.popleft()
+            count -= expired.report_count
+            total -= expired.fragility_sum
+        averages.append((row.day, total / count))
+    return averages
+
+
+def _points(series: List[Tuple[date, float]], start: date, end: date, y_max: float = 10) -> List[Tuple[float, float]]:
+    """Project (day, value) pairs onto the chart's SVG coordinates"""
+    span = max((end - start).days, 1)
+    return [
+        (
+            round((day - start).days / span * CHART_WIDTH, 1),
+            round(CHART_HEIGHT - min(value, y_max) / y_max * CHART_HEIGHT, 1)
+        )
+        for day, value in series
+    ]
+
+
+def _polyline(points: List[Tuple[float, float]]) -> str:
+    return " ".join(f"{x},{y}" for x, y in points)
+
+
+async def get_industry_trend(session: AsyncSession, industry_key: str, days: int) -> Optional[dict]:
+    """Daily fragility, its rolling average, and category impact for one industry"""
+    window_days = settings.analytics_rolling_window_days
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+
+    # Read back far enough that the first rolling value has a full window
+    statement = (
+        select(IndustryRiskDaily)
+        .where(IndustryRiskDaily.industry_key == industry_key)
+        .where(IndustryRiskDaily.day >= start - timedelta(days=window_days - 1))
+        .order_by(IndustryRiskDaily.day)
+    )
+    rows = (await session.exec(statement)).all()
+    visible = [row for row in rows if row.day >= start]
+    if not visible:
+        return None
+
+    daily = [(row.day, row.fragility_avg) for row in visible]
+    rolling = [(day, value) for day, value in rolling_average(rows, window_days) if day >= start]
+
+    statement = (
+        select(IndustryCategoryDaily)
+        .where(IndustryCategoryDaily.industry_key == industry_key)
+        .where(IndustryCategoryDaily.day >= start)
+        .order_by(IndustryCategoryDaily.day)
+    )
+    by_category: Dict[str, List[Tuple[date, float]]] = defaultdict(list)
+    for row in (await session.exec(statement)).all():
+        by_category[row.category].append((row.day, row.impact_avg))
+
+    categories = []
+    for index, (name, series) in enumerate(sorted(by_category.items())):
+        points = _points(series, start, end)
+        categories.append({
+            "name": name,
+            "color": CATEGORY_COLORS[index % len(CATEGORY_COLORS)],
+            "latest": round(series[-1][1], 1),
+            "points": points,
+            "polyline": _polyline(points)
+        })
+
+    daily_points = _points(daily, start, end)
+    report_count = sum(row.report_count for row in visible)
+    return {
+        "industry": visible[-1].industry,
+        "industry_key": industry_key,
+        "days": days,
+        "window_days": window_days,
+        "start": start.strftime("%b %d, %Y"),
+        "end": end.strftime("%b %d, %Y"),
+        "report_count": report_count,
+        "average": round(sum(row.fragility_sum for row in visible) / report_count, 1),
+        "latest": round(daily[-1][1], 1),
+        "latest_rolling": round(rolling[-1][1], 1),
+        "minimum": min(row.fragility_min for row in visible),
+        "maximum": max(row.fragility_max for row in visible),
+        "daily_points": daily_points,
+        "daily_polyline": _polyline(daily_points),
+        "rolling_polyline": _polyline(_points(rolling, start, end)),
+        "categories": categories,
+        "width": CHART_WIDTH,
+        "height": CHART_HEIGHT
+    }
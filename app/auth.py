@@ -1,9 +1,17 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import Request, HTTPException, status
+from app.cache import TTLCache
+from app.events import USER_INVALIDATED_EVENT, apublish_event, broadcaster
 from app.models import User
 from app.config import get_settings
 
@@ -12,11 +20,51 @@ settings = get_settings()
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is CPU-bound (and releases the GIL), so it runs off the event loop in a
+# bounded pool. The semaphore caps running + queued jobs so a login burst fails
+# fast instead of piling up behind the pool.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
+_hash_slots = threading.BoundedSemaphore(
+    settings.password_hash_workers + settings.password_hash_queue_limit
+)
+
 # JWT settings
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 7
 
 
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Identity resolved from a session token, cached between requests"""
+    id: int
+    username: str
+    email: str
+    is_active: bool
+
+
+# Session token -> AuthenticatedUser
+user_cache = TTLCache(
+    max_entries=settings.auth_cache_max_entries,
+    ttl_seconds=settings.auth_cache_ttl_seconds
+)
+
+
+def _drop_cached_user(user_id: int):
+    user_cache.delete_where(lambda cached: cached.id == user_id)
+
+
+async def invalidate_user(user_id: int):
+    """Drop cached identities for a user in every web process (e.g. after is_active changes)"""
+    _drop_cached_user(user_id)
+    await apublish_event(USER_INVALIDATED_EVENT, user_id=user_id)
+
+
+broadcaster.on(USER_INVALIDATED_EVENT, lambda event: _drop_cached_user(event["user_id"]))
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -27,6 +75,31 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_job(func, *args):
+    """Run a password hashing job in the pool, or raise 503 when it is saturated"""
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_slots.release()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop"""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await _run_password_job(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -40,39 +113,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def authenticate_user(session: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(session: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate a user"""
     statement = select(User).where(User.username == username)
-    user = session.exec(statement).first()
+    user = (await session.exec(statement)).first()
     
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     
     return user
 
 
-def create_user(session: Session, username: str, email: str, password: str) -> User:
+async def create_user(session: AsyncSession, username: str, email: str, password: str) -> User:
     """Create a new user"""
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
     user = User(
         username=username,
         email=email,
         hashed_password=hashed_password
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
+    await invalidate_user(user.id)
     return user
 
 
-def get_current_user_from_session(request: Request, session: Session) -> Optional[User]:
+async def get_current_user_from_session(request: Request, session: AsyncSession) -> Optional[AuthenticatedUser]:
     """Get current user from session cookie"""
     token = request.cookies.get(settings.session_cookie_name)
     if not token:
         return None
     
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached if cached.is_active else None
+    
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
         user_id: int = payload.get("user_id")
@@ -81,13 +159,27 @@ def get_current_user_from_session(request: Request, session: Session) -> Optiona
     except JWTError:
         return None
     
-    user = session.get(User, user_id)
-    return user
+    user = await session.get(User, user_id)
+    if not user:
+        return None
+    
+    identity = AuthenticatedUser(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        is_active=user.is_active
+    )
+    # Never cache a token past its own expiry
+    ttl = min(settings.auth_cache_ttl_seconds, payload["exp"] - time.time())
+    if ttl > 0:
+        user_cache.set(token, identity, ttl_seconds=ttl)
+    
+    return identity if identity.is_active else None
 
 
-def require_auth(request: Request, session: Session) -> User:
+async def require_auth(request: Request, session: AsyncSession) -> AuthenticatedUser:
     """Require authentication, raise exception if not authenticated"""
-    user = get_current_user_from_session(request, session)
+    user = await get_current_user_from_session(request, session)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
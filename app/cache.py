@@ -0,0 +1,332 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from app.config import get_settings
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with per-entry expiry
+
+    Thread-safe so it can be shared by the event loop and worker threads.
+    Hit/miss counters are kept so callers can verify the cache is effective.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches the predicate"""
+        with self._lock:
+            keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+_redis_client = None
+_async_redis_client = None
+
+
+def get_async_redis():
+    """Get a lazily created Redis client for use on the event loop"""
+    global _async_redis_client
+    if _async_redis_client is None:
+        import redis.asyncio as aioredis
+        _async_redis_client = aioredis.Redis.from_url(
+            get_settings().redis_url,
+            socket_connect_timeout=2,
+            socket_timeout=2
+        )
+    return _async_redis_client
+
+
+def get_redis():
+    """Get a lazily created, process-wide Redis client"""
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(
+            get_settings().redis_url,
+            socket_connect_timeout=2,
+            socket_timeout=2
+        )
+    return _redis_client
+
+
+class SharedCache:
+    """
+    JSON cache stored in Redis, falling back to an in-process TTLCache
+
+    When Redis is unreachable the cache keeps working per process and
+    retries Redis after a short back-off instead of on every call.
+
+    Values backed by Redis are only kept locally for ``local_ttl_seconds``,
+    so a write from another process shows up here within that time. Pass
+    ``local_ttl_seconds=None`` for values that never change once written.
+    """
+
+    REDIS_RETRY_SECONDS = 30
+    LOCAL_TTL_SECONDS = 5
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float,
+        max_local_entries: int = 256,
+        shared: bool = True,
+        local_ttl_seconds: Optional[float] = LOCAL_TTL_SECONDS
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self.local_ttl_seconds = local_ttl_seconds
+        self.local = TTLCache(max_entries=max_local_entries, ttl_seconds=ttl_seconds)
+        self._redis_down_until = 0.0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _redis_available(self) -> bool:
+        return self.shared and time.monotonic() >= self._redis_down_until
+
+    def _redis(self):
+        return get_redis() if self._redis_available() else None
+
+    def _redis_failed(self, exc: Exception):
+        print(f"--- CACHE {self.namespace}: REDIS UNAVAILABLE ({exc}), USING MEMORY ---")
+        self._redis_down_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    def _set_local(self, key: str, value: Any, ttl: float, in_redis: bool):
+        """Keep a local copy; only briefly when Redis holds the shared one"""
+        if in_redis and self.local_ttl_seconds is not None:
+            ttl = min(ttl, self.local_ttl_seconds)
+        self.local.set(key, value, ttl_seconds=ttl)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            raw = client.get(self._key(key))
+        except Exception as exc:
+            self._redis_failed(exc)
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self._set_local(key, value, self.ttl_seconds, in_redis=True)
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        client = self._redis()
+        if client is not None:
+            try:
+                client.set(self._key(key), json.dumps(value), ex=max(1, int(ttl)))
+            except Exception as exc:
+                self._redis_failed(exc)
+                client = None
+        self._set_local(key, value, ttl, in_redis=client is not None)
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            client.delete(self._key(key))
+        except Exception as exc:
+            self._redis_failed(exc)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Like get, but reads Redis without blocking the event loop"""
+        value = self.local.get(key)
+        if value is not None or not self._redis_available():
+            return value
+        try:
+            raw = await get_async_redis().get(self._key(key))
+        except Exception as exc:
+            self._redis_failed(exc)
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self._set_local(key, value, self.ttl_seconds, in_redis=True)
+        return value
+
+    async def aset(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Like set, but writes Redis without blocking the event loop"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        in_redis = self._redis_available()
+        if in_redis:
+            try:
+                await get_async_redis().set(self._key(key), json.dumps(value), ex=max(1, int(ttl)))
+            except Exception as exc:
+                self._redis_failed(exc)
+                in_redis = False
+        self._set_local(key, value, ttl, in_redis)
+
+
+class StaleWhileRevalidateCache:
+    """
+    SharedCache wrapper that serves stale entries while refreshing them
+
+    Entries younger than ``fresh_seconds`` are returned as-is. Entries up to
+    ``fresh_seconds + stale_seconds`` old are returned immediately while a
+    background thread reloads them. Anything older is loaded synchronously.
+    Every entry records when it was fetched so callers can report provenance.
+    Before refreshing, the shared copy is re-read in case another process
+    has already refreshed it.
+    """
+
+    def __init__(self, namespace: str, fresh_seconds: float, stale_seconds: float, max_local_entries: int = 256):
+        self.fresh_seconds = fresh_seconds
+        self.store = SharedCache(namespace, fresh_seconds + stale_seconds, max_local_entries)
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        # Strong references to background revalidation tasks on the event loop
+        self._tasks: set = set()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable hash of the values that identify an entry"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _load(self, key: str, loader: Callable[[], Any]) -> Dict[str, Any]:
+        entry = {"fetched_at": time.time(), "value": loader()}
+        self.store.set(key, entry)
+        return entry
+
+    def _is_stale(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["fetched_at"] > self.fresh_seconds
+
+    def _newer_shared(self, key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """The shared copy of a stale local entry, when another process fetched it later"""
+        if not self.store._redis_available():
+            return entry
+        self.store.local.delete(key)
+        shared = self.store.get(key)
+        return shared if shared is not None and shared["fetched_at"] > entry["fetched_at"] else entry
+
+    async def _anewer_shared(self, key: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.store._redis_available():
+            return entry
+        self.store.local.delete(key)
+        shared = await self.store.aget(key)
+        return shared if shared is not None and shared["fetched_at"] > entry["fetched_at"] else entry
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._load(key, loader)
+            except Exception as exc:
+                print(f"--- CACHE REFRESH FAILED ({exc}), KEEPING STALE ENTRY ---")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Dict[str, Any]:
+        """
+        Return ``{"fetched_at": epoch_seconds, "value": ...}`` for the key
+
+        ``loader`` is only called on a miss or to revalidate a stale entry.
+        """
+        entry = self.store.get(key)
+        if entry is None:
+            return self._load(key, loader)
+        if self._is_stale(entry):
+            entry = self._newer_shared(key, entry)
+        if self._is_stale(entry):
+            self._refresh_in_background(key, loader)
+        return entry
+
+    async def _aload(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        entry = {"fetched_at": time.time(), "value": await loader()}
+        await self.store.aset(key, entry)
+        return entry
+
+    def _arefresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._aload(key, loader)
+            except Exception as exc:
+                print(f"--- CACHE REFRESH FAILED ({exc}), KEEPING STALE ENTRY ---")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        """Like get_or_load for a coroutine loader; stale entries are revalidated in a task"""
+        entry = await self.store.aget(key)
+        if entry is None:
+            return await self._aload(key, loader)
+        if self._is_stale(entry):
+            entry = await self._anewer_shared(key, entry)
+        if self._is_stale(entry):
+            self._arefresh_in_background(key, loader)
+        return entry
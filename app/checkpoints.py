@@ -0,0 +1,151 @@
+"""
+Persistent LangGraph checkpoints for research runs
+
+Each research task runs the graph on its own thread (thread_id = task_id),
+and a checkpoint is written after every node. When a Celery retry picks the
+task up again the graph resumes after the last completed node instead of
+repeating the search. Postgres deployments store checkpoints in the main
+database; SQLite (local development) uses a separate file.
+
+The async savers (for graphs run on the worker's event loop) share the same
+tables, so a run may be resumed by either execution mode.
+"""
+import asyncio
+import threading
+from typing import Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+# Tables created by the LangGraph savers themselves (ignored by Alembic autogenerate)
+CHECKPOINT_TABLES = {"checkpoints", "checkpoint_blobs", "checkpoint_writes", "checkpoint_migrations"}
+
+_checkpointer = None
+_lock = threading.Lock()
+_async_checkpointer = None
+_async_lock = asyncio.Lock()
+
+
+def _postgres_conninfo(database_url: str) -> str:
+    """psycopg 3 conninfo for a SQLAlchemy postgresql URL"""
+    return "postgresql://" + database_url.split("://", 1)[1]
+
+
+def get_checkpointer():
+    """Get the process-wide checkpoint saver, creating its tables on first use"""
+    global _checkpointer
+    with _lock:
+        if _checkpointer is None:
+            if settings.database_url.startswith("postgresql"):
+                from psycopg.rows import dict_row
+                from psycopg_pool import ConnectionPool
+                from langgraph.checkpoint.postgres import PostgresSaver
+
+                pool = ConnectionPool(
+                    _postgres_conninfo(settings.database_url),
+                    max_size=settings.checkpoint_pool_size,
+                    kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                    open=True
+                )
+                saver = PostgresSaver(pool)
+            else:
+                import sqlite3
+                from langgraph.checkpoint.sqlite import SqliteSaver
+
+                saver = SqliteSaver(sqlite3.connect(settings.checkpoint_sqlite_path, check_same_thread=False))
+            saver.setup()
+            _checkpointer = saver
+        return _checkpointer
+
+
+async def get_async_checkpointer():
+    """Get the async checkpoint saver, bound to the calling (long-lived) event loop"""
+    global _async_checkpointer
+    async with _async_lock:
+        if _async_checkpointer is None:
+            if settings.database_url.startswith("postgresql"):
+                from psycopg.rows import dict_row
+                from psycopg_pool import AsyncConnectionPool
+                from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+                pool = AsyncConnectionPool(
+                    _postgres_conninfo(settings.database_url),
+                    max_size=settings.checkpoint_pool_size,
+                    kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                    open=False
+                )
+                await pool.open()
+                saver = AsyncPostgresSaver(pool)
+            else:
+                import aiosqlite
+                from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+                saver = AsyncSqliteSaver(await aiosqlite.connect(settings.checkpoint_sqlite_path))
+            await saver.setup()
+            _async_checkpointer = saver
+        return _async_checkpointer
+
+
+def thread_config(task_id: str) -> dict:
+    """Graph config addressing one task's checkpoints"""
+    return {"configurable": {"thread_id": str(task_id)}}
+
+
+def delete_checkpoints(task_id: str):
+    """Drop a task's checkpoints once its report is saved (best effort)"""
+    # The pinned savers don't implement delete_thread yet, so delete directly
+    saver = get_checkpointer()
+    try:
+        if settings.database_url.startswith("postgresql"):
+            with saver.conn.connection() as conn:
+                for table in ("checkpoint_writes", "checkpoint_blobs", "checkpoints"):
+                    conn.execute(f"DELETE FROM {table} WHERE thread_id = %s", (str(task_id),))
+        else:
+            with saver.lock, saver.conn:
+                for table in ("writes", "checkpoints"):
+                    saver.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (str(task_id),))
+    except Exception as exc:
+        print(f"--- FAILED TO DELETE CHECKPOINTS FOR {task_id}: {exc} ---")
+
+
+async def adelete_checkpoints(task_id: str):
+    """Async delete_checkpoints, through the async saver"""
+    saver = await get_async_checkpointer()
+    try:
+        if settings.database_url.startswith("postgresql"):
+            async with saver.conn.connection() as conn:
+                for table in ("checkpoint_writes", "checkpoint_blobs", "checkpoints"):
+                    await conn.execute(f"DELETE FROM {table} WHERE thread_id = %s", (str(task_id),))
+        else:
+            async with saver.lock:
+                for table in ("writes", "checkpoints"):
+                    await saver.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (str(task_id),))
+                await saver.conn.commit()
+    except Exception as exc:
+        print(f"--- FAILED TO DELETE CHECKPOINTS FOR {task_id}: {exc} ---")
+
+
+def checkpoint_history(task_id: str, limit: Optional[int] = 20) -> list:
+    """
+    Summaries of a task's checkpoints, newest first
+
+    Read straight from the saver, so callers (the admin) don't load the agent.
+    """
+    history = []
+    for item in get_checkpointer().list(thread_config(task_id), limit=limit):
+        values = item.checkpoint.get("channel_values") or {}
+        metadata = item.metadata or {}
+        history.append({
+            "checkpoint_id": item.config["configurable"].get("checkpoint_id"),
+            "created_at": item.checkpoint.get("ts"),
+            "step": metadata.get("step"),
+            "source": metadata.get("source"),
+            # Nodes whose output this checkpoint records ("__start__" for the input)
+            "after": [node for node in (metadata.get("writes") or {}) if node != "__start__"],
+            "documents": len(values.get("documents") or []),
+            "raw_data": len(values.get("raw_data") or []),
+            "context_tokens_compacted": values.get("context_tokens_compacted"),
+            "fragility_score": values.get("fragility_score"),
+            "risk_report": (values.get("risk_report") or "")[:500]
+        })
+    return history
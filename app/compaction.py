@@ -0,0 +1,146 @@
+"""
+Context compaction for the analyst prompt
+
+Search results (especially ``search_depth="advanced"`` article bodies) are
+split into passages, stripped of boilerplate, deduplicated across sources
+and packed by relevance into a token budget before they reach the LLM.
+"""
+import re
+from typing import Dict, List
+
+# Rough chars-per-token ratio for English prose; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Terms that make a passage worth keeping for a supply chain risk analysis
+RISK_TERMS = {
+    "strike", "strikes", "shortage", "shortages", "delay", "delays", "disruption",
+    "disruptions", "port", "ports", "tariff", "tariffs", "sanction", "sanctions",
+    "congestion", "shipping", "freight", "supplier", "suppliers", "inventory",
+    "logistics", "labor", "labour", "union", "geopolitical", "embargo", "export",
+    "import", "semiconductor", "chip", "chips", "raw", "materials", "factory",
+    "plant", "outage", "backlog", "lead", "capacity", "recall", "bottleneck",
+}
+
+BOILERPLATE_PATTERNS = re.compile(
+    r"(cookie|subscribe|sign up|sign in|log in|newsletter|advertisement|"
+    r"all rights reserved|privacy policy|terms of (use|service)|click here|"
+    r"read more|follow us|share this|related articles|skip to (main )?content|"
+    r"accept all|javascript|©)",
+    re.IGNORECASE
+)
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text"""
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def _is_boilerplate(line: str) -> bool:
+    stripped = line.strip()
+    if len(stripped) < 25 and not stripped.endswith((".", "!", "?")):
+        return True
+    if stripped.startswith(("http://", "https://")) and " " not in stripped:
+        return True
+    return len(stripped) < 200 and bool(BOILERPLATE_PATTERNS.search(stripped))
+
+
+def split_passages(content: str, max_chars: int = 800) -> List[str]:
+    """Split article content into boilerplate-free passages of bounded size"""
+    lines = [line for line in content.splitlines() if line.strip() and not _is_boilerplate(line)]
+    passages, current = [], ""
+    for line in lines:
+        for sentence in re.split(r"(?<=[.!?])\s+", line.strip()):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+        # Paragraph boundaries are natural passage breaks once there is enough text
+        if len(current) >= max_chars // 2:
+            passages.append(current)
+            current = ""
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _shingles(words: List[str], size: int = 5) -> set:
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _relevance(words: List[str], focus_terms: set) -> float:
+    if not words:
+        return 0.0
+    hits = sum(1 for word in words if word in RISK_TERMS or word in focus_terms)
+    return hits / len(words) ** 0.5
+
+
+def _format_document(doc: Dict, content: str) -> str:
+    header = f"Source: {doc['url']}"
+    if doc.get("topic"):
+        header += f"\nTopic: {doc['topic']}"
+    return f"{header}\nContent: {content}"
+
+
+def compact_documents(
+    documents: List[Dict],
+    industry: str,
+    token_budget: int,
+    similarity_threshold: float = 0.8
+) -> Dict:
+    """
+    Pack the most relevant, non-duplicate passages into a token budget
+
+    ``documents`` are dicts with ``url``, ``content`` and optional ``topic`` and
+    ``score``. Returns ``raw_data`` (one entry per source that kept at least one
+    passage, followed by the URLs of any sources that kept none), plus token
+    counts before and after compaction.
+    """
+    focus_terms = set(WORD_RE.findall(industry.lower()))
+    raw_tokens = sum(estimate_tokens(_format_document(doc, doc.get("content", ""))) for doc in documents)
+
+    candidates = []
+    seen_shingles: List[set] = []
+    for doc_index, doc in enumerate(documents):
+        for passage_index, passage in enumerate(split_passages(doc.get("content", ""))):
+            words = WORD_RE.findall(passage.lower())
+            shingles = _shingles(words)
+            # Near-duplicate passages (syndicated copy, quotes) are kept once
+            if any(len(shingles & other) / len(shingles | other) >= similarity_threshold for other in seen_shingles):
+                continue
+            seen_shingles.append(shingles)
+            score = _relevance(words, focus_terms) * (1 + doc.get("score", 0))
+            candidates.append((score, doc_index, passage_index, passage))
+
+    # Reserve room to list every consulted URL, even if none of its passages make the cut
+    used = estimate_tokens("Other sources consulted:\n" + "\n".join(doc["url"] for doc in documents))
+    selected = []
+    for candidate in sorted(candidates, key=lambda c: c[0], reverse=True):
+        cost = estimate_tokens(candidate[3])
+        if used + cost > token_budget:
+            continue
+        selected.append(candidate)
+        used += cost
+
+    # Re-group kept passages by source, in original reading order
+    by_doc: Dict[int, List] = {}
+    for _, doc_index, passage_index, passage in sorted(selected, key=lambda c: (c[1], c[2])):
+        by_doc.setdefault(doc_index, []).append(passage)
+
+    raw_data = [
+        _format_document(documents[doc_index], "\n".join(passages))
+        for doc_index, passages in by_doc.items()
+    ]
+
+    unused = [doc["url"] for index, doc in enumerate(documents) if index not in by_doc]
+    if unused:
+        raw_data.append("Other sources consulted:\n" + "\n".join(unused))
+
+    return {
+        "raw_data": raw_data,
+        "context_tokens_raw": raw_tokens,
+        "context_tokens_compacted": sum(estimate_tokens(text) for text in raw_data),
+    }
@@ -1,4 +1,6 @@
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.config import get_settings
 
 settings = get_settings()
@@ -11,12 +13,61 @@ engine = create_engine(
 )
 
 
+def get_async_database_url(database_url: str) -> str:
+    """Map a sync database URL onto its async driver"""
+    if database_url.startswith(("postgresql://", "postgresql+psycopg2://")):
+        return "postgresql+asyncpg://" + database_url.split("://", 1)[1]
+    if database_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + database_url.split("://", 1)[1]
+    return database_url
+
+
+# Async engine used by the route handlers so DB round-trips don't block the event loop
+async_engine = create_async_engine(
+    settings.async_database_url or get_async_database_url(settings.database_url),
+    echo=settings.debug,
+    pool_pre_ping=True
+)
+
+
 def create_db_and_tables():
-    """Create all database tables"""
-    SQLModel.metadata.create_all(engine)
+    """
+    Create a fresh local SQLite database at startup
+
+    The schema is managed by Alembic. Only an empty SQLite database is
+    created from the models, then stamped at the head revision so later
+    ``alembic upgrade head`` runs apply on top of it. Anything else (every
+    Postgres database) must be migrated with ``alembic upgrade head``.
+    """
+    from pathlib import Path
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from sqlalchemy import inspect
+    import app.models  # noqa: F401 - registers tables on SQLModel.metadata
+    from app.search import ensure_search_schema
+    
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        if inspect(conn).get_table_names():
+            return
+        SQLModel.metadata.create_all(conn)
+        ensure_search_schema(conn)
+        root = Path(__file__).resolve().parent.parent
+        config = Config(str(root / "alembic.ini"))
+        config.set_main_option("script_location", str(root / "alembic"))
+        MigrationContext.configure(conn).stamp(ScriptDirectory.from_config(config), "head")
+    print("--- CREATED SQLITE DATABASE AT THE HEAD MIGRATION ---")
 
 
 def get_session():
     """Dependency for getting database session"""
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    """Dependency for getting an async database session"""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,49 @@
+"""
+Task dispatch for the web tier
+
+Web processes queue Celery tasks by name through a producer-only Celery app,
+so they never import app.tasks (and with it the agent, LangGraph and the
+provider SDKs). Celery itself is imported on the first dispatch, not at
+startup. Task names must match the ones registered in app.tasks.
+
+Each task type has its own broker queue, so interactive runs never wait
+behind the daily scheduled batch or behind retries that are backing off.
+"""
+import threading
+from app.config import get_settings
+from app.models import TaskTypeEnum
+
+settings = get_settings()
+
+RESEARCH_TASK = "app.tasks.run_research_task"
+
+# Broker queue per task type (app.tasks routes its tasks onto these too)
+TASK_QUEUES = {
+    TaskTypeEnum.MANUAL: "research-manual",
+    TaskTypeEnum.SCHEDULED: "research-scheduled",
+    TaskTypeEnum.RETRY: "research-retry",
+}
+
+# Broker queues the workers consume (reported as queue depth on /metrics)
+QUEUES = list(TASK_QUEUES.values())
+
+_producer = None
+_lock = threading.Lock()
+
+
+def get_producer():
+    """Get the process-wide Celery app used only to send tasks"""
+    global _producer
+    with _lock:
+        if _producer is None:
+            from celery import Celery
+
+            producer = Celery("supply_chain_tasks", broker=settings.redis_url)
+            producer.conf.update(task_serializer="json", accept_content=["json"])
+            _producer = producer
+        return _producer
+
+
+def dispatch_research(task_id: str, industry: str, task_type: TaskTypeEnum = TaskTypeEnum.MANUAL):
+    """Queue a research run for an existing TaskStatus record on its type's queue"""
+    get_producer().send_task(RESEARCH_TASK, args=[str(task_id), industry], queue=TASK_QUEUES[task_type])
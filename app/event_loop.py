@@ -0,0 +1,44 @@
+"""
+Background event loop for async research runs in Celery workers
+
+Each worker process starts one event loop in a daemon thread. Celery's
+threads pool hands every task a thread that submits its coroutine to that
+loop and waits, so a single process overlaps as many research runs as it
+has pool threads while all their network I/O is multiplexed on one loop.
+The loop is created lazily, after the worker process has started (or
+forked), and lives as long as the process so loop-bound clients (async
+checkpointer, Redis, HTTP) can be reused across tasks.
+"""
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Any, Coroutine, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get this process's background event loop, starting it on first use"""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="research-event-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def run_coroutine(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the background loop and block the calling thread for its result
+
+    On timeout the coroutine is cancelled and TimeoutError is raised (Celery
+    doesn't enforce time limits in the threads pool).
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeout:
+        future.cancel()
+        raise TimeoutError(f"Coroutine did not finish within {timeout}s")
@@ -0,0 +1,165 @@
+import asyncio
+import json
+from typing import Callable, Dict, Optional, Set
+import redis
+import redis.asyncio as aioredis
+from app.cache import get_async_redis, get_redis
+from app.config import get_settings
+
+settings = get_settings()
+
+# SSE event names: status changes refresh the task list, progress ticks only
+# update the running task's row in place
+TASK_UPDATE_EVENT = "task-update"
+TASK_PROGRESS_EVENT = "task-progress"
+# Control events on the same channel, handled in every web process and never sent to clients
+USER_INVALIDATED_EVENT = "user-invalidated"
+
+
+def _task_event(
+    task_id: str,
+    status: str,
+    progress: int,
+    industry: Optional[str] = None,
+    report_id: Optional[int] = None,
+    progress_only: bool = False
+) -> str:
+    return json.dumps({
+        "task_id": str(task_id),
+        "status": status,
+        "progress": progress,
+        "industry": industry,
+        "report_id": report_id,
+        "event": TASK_PROGRESS_EVENT if progress_only else TASK_UPDATE_EVENT
+    })
+
+
+def publish_task_event(*args, **kwargs):
+    """Publish a task state change (or a progress tick) to every connected dashboard"""
+    try:
+        get_redis().publish(settings.task_events_channel, _task_event(*args, **kwargs))
+    except redis.RedisError as exc:
+        # Events are best-effort; dashboards still render from the database
+        print(f"--- FAILED TO PUBLISH TASK EVENT: {exc} ---")
+
+
+async def apublish_task_event(*args, **kwargs):
+    """publish_task_event on the event loop (route handlers)"""
+    try:
+        await get_async_redis().publish(settings.task_events_channel, _task_event(*args, **kwargs))
+    except redis.RedisError as exc:
+        print(f"--- FAILED TO PUBLISH TASK EVENT: {exc} ---")
+
+
+async def apublish_event(event: str, **fields):
+    """Publish a control event to every web process's listener"""
+    try:
+        await get_async_redis().publish(settings.task_events_channel, json.dumps({"event": event, **fields}))
+    except redis.RedisError as exc:
+        print(f"--- FAILED TO PUBLISH {event} EVENT: {exc} ---")
+
+
+def task_event_name(data: str) -> str:
+    """SSE event name for a published task event"""
+    try:
+        return json.loads(data).get("event", TASK_UPDATE_EVENT)
+    except (ValueError, AttributeError):
+        return TASK_UPDATE_EVENT
+
+
+class TaskEventBroadcaster:
+    """
+    Fan out task events from a single Redis subscription to many clients
+
+    One subscriber per web process listens on the task events channel and
+    copies each message into a bounded queue per connected client. Control
+    events with a registered handler go to the handler instead; the listener
+    is started with the app so they arrive without any client connected.
+    """
+
+    def __init__(self, channel: str, queue_size: int = 100):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._clients: Set[asyncio.Queue] = set()
+        self._listener: Optional[asyncio.Task] = None
+        self._redis: Optional[aioredis.Redis] = None
+        self._handlers: Dict[str, Callable[[dict], None]] = {}
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def on(self, event: str, handler: Callable[[dict], None]):
+        """Handle a control event in this process"""
+        self._handlers[event] = handler
+
+    def start(self):
+        """Start the shared listener if it isn't running"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a client and start the shared listener if needed"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._clients.add(queue)
+        self.start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove a client"""
+        self._clients.discard(queue)
+
+    async def _listen(self):
+        """Read from Redis and copy each message to every client queue"""
+        while True:
+            try:
+                self._redis = aioredis.Redis.from_url(settings.redis_url)
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    handler = self._handlers.get(task_event_name(data))
+                    if handler is None:
+                        self._broadcast(data)
+                        continue
+                    try:
+                        handler(json.loads(data))
+                    except Exception as exc:
+                        print(f"--- TASK EVENT HANDLER ERROR: {exc} ---")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"--- TASK EVENT LISTENER ERROR: {exc} ---")
+                await asyncio.sleep(1)
+            finally:
+                if self._redis is not None:
+                    await self._redis.aclose()
+                    self._redis = None
+
+    def _broadcast(self, data: str):
+        for queue in list(self._clients):
+            if queue.full():
+                # Slow client: drop its oldest event rather than block everyone
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(data)
+
+    async def close(self):
+        """Stop the shared listener"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._clients.clear()
+
+
+broadcaster = TaskEventBroadcaster(settings.task_events_channel)
@@ -0,0 +1,65 @@
+"""
+Conditional GET support for HTMX fragments
+
+Fragment endpoints compute a cheap version (ETag, optionally Last-Modified)
+before rendering. When the client already holds that version it gets a bare
+304 and Jinja is never invoked; otherwise the rendered response is tagged so
+the next poll can be answered the same way.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Build a strong ETag from the values that determine a fragment's content"""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    # Naive timestamps in this app are UTC
+    return format_datetime(value.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+
+def _validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Cookie, HX-Request"}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Check the request's validators against the current version"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates or "*" in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(tzinfo=None, microsecond=0) <= since
+
+    return False
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Return a 304 response when the client's copy is current, else None"""
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=_validator_headers(etag, last_modified))
+    return None
+
+
+def tag_response(response: Response, etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Attach validators to a freshly rendered fragment"""
+    response.headers.update(_validator_headers(etag, last_modified))
+    return response
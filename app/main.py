@@ -1,11 +1,18 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.routing import Mount
 from sqladmin import Admin
+from app.auth import user_cache
 from app.config import get_settings
 from app.database import engine, create_db_and_tables
+from app.dispatch import QUEUES
+from app.events import broadcaster
+from app.metrics import HTTP_REQUEST_SECONDS, CeleryQueueCollector, render_metrics
 from app.routes import auth, dashboard, api
-from app.admin import UserAdmin, TaskStatusAdmin, ReportAdmin
+from app.admin import UserAdmin, TaskStatusAdmin, ReportAdmin, IndustryRiskDailyAdmin
 
 settings = get_settings()
 
@@ -24,6 +31,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _route_label(request: Request) -> str:
+    """Route template for metrics labels (never the raw path, to bound cardinality)"""
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    for mounted in app.routes:
+        if isinstance(mounted, Mount) and request.url.path.startswith(mounted.path + "/"):
+            return mounted.path + "/*"
+    return "unmatched"
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe request latency per route (streaming responses: time to first byte)"""
+    if not settings.metrics_enabled:
+        return await call_next(request)
+    start = time.perf_counter()
+    response = await call_next(request)
+    HTTP_REQUEST_SECONDS.labels(request.method, _route_label(request), response.status_code).observe(
+        time.perf_counter() - start
+    )
+    return response
+
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(dashboard.router, tags=["dashboard"])
@@ -34,18 +65,40 @@ admin = Admin(app, engine, title="Supply Chain Admin")
 admin.add_view(UserAdmin)
 admin.add_view(TaskStatusAdmin)
 admin.add_view(ReportAdmin)
+admin.add_view(IndustryRiskDailyAdmin)
 
 
 @app.on_event("startup")
 def on_startup():
-    """Create database tables on startup"""
+    """Create a fresh SQLite development database on startup (others use Alembic)"""
     create_db_and_tables()
 
 
+@app.on_event("startup")
+async def start_event_listener():
+    """Listen for task and control events (e.g. auth cache invalidation) from startup"""
+    broadcaster.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Stop the shared task event listener"""
+    await broadcaster.close()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics, with Celery queue depth read at scrape time"""
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    body, content_type = render_metrics(CeleryQueueCollector(QUEUES))
+    return Response(body, media_type=content_type)
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {"status": "healthy", "auth_cache": user_cache.stats()}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+"""
+Prometheus metrics
+
+The web app serves them on /metrics (HTTP latency per route, plus Celery
+queue depth read from Redis at scrape time). Celery workers record the
+agent metrics (node wall time, Tavily latency and result counts, LLM
+tokens, database commit latency) and serve them on worker_metrics_port.
+With PROMETHEUS_MULTIPROC_DIR set (prefork workers, several uvicorn
+workers), samples are aggregated across the processes sharing that directory.
+"""
+import os
+from typing import Iterable
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from app.cache import get_redis
+
+# Provider calls and graph nodes take seconds to minutes
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"]
+)
+
+NODE_SECONDS = Histogram(
+    "research_node_duration_seconds",
+    "Wall time of each research graph node",
+    ["node"],
+    buckets=SLOW_BUCKETS
+)
+
+TAVILY_REQUEST_SECONDS = Histogram(
+    "tavily_request_duration_seconds",
+    "Latency of Tavily searches (cache misses only)",
+    ["outcome"],
+    buckets=SLOW_BUCKETS
+)
+
+TAVILY_RESULTS = Histogram(
+    "tavily_results_per_search",
+    "Results returned per Tavily search",
+    buckets=(0, 1, 2, 3, 5, 10, 20)
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "LLM tokens used by the analyst",
+    ["model", "kind"]
+)
+
+DB_COMMIT_SECONDS = Histogram(
+    "db_commit_duration_seconds",
+    "Latency of database writes made by research tasks",
+    ["operation"]
+)
+
+
+def record_llm_tokens(model: str, prompt_tokens: int, completion_tokens: int):
+    LLM_TOKENS.labels(model, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model, "completion").inc(completion_tokens)
+
+
+class CeleryQueueCollector:
+    """Reports the length of each Celery queue in Redis at scrape time"""
+
+    def __init__(self, queues: Iterable[str]):
+        self.queues = list(queues)
+
+    def collect(self):
+        gauge = GaugeMetricFamily("celery_queue_length", "Messages waiting in each Celery queue", labels=["queue"])
+        try:
+            with get_redis().pipeline(transaction=False) as pipe:
+                for queue in self.queues:
+                    pipe.llen(queue)
+                lengths = pipe.execute()
+        except Exception as exc:
+            print(f"--- QUEUE DEPTH UNAVAILABLE ({exc}) ---")
+            return
+        for queue, length in zip(self.queues, lengths):
+            gauge.add_metric([queue], length)
+        yield gauge
+
+
+def _registry() -> CollectorRegistry:
+    """The default registry, or an aggregate over PROMETHEUS_MULTIPROC_DIR"""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics(*collectors) -> tuple:
+    """(body, content type) for a scrape, including extra scrape-time collectors"""
+    registry = _registry()
+    body = generate_latest(registry)
+    if collectors:
+        extra = CollectorRegistry()
+        for collector in collectors:
+            extra.register(collector)
+        body += generate_latest(extra)
+    return body, CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int):
+    """Serve this process's metrics over HTTP (Celery workers)"""
+    from prometheus_client import start_http_server
+
+    start_http_server(port, registry=_registry())
+    print(f"--- METRICS ON :{port}/metrics ---")
@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 from enum import Enum
 from uuid import UUID, uuid4
+from sqlalchemy import Index, LargeBinary
 from sqlmodel import SQLModel, Field, Relationship, Column, JSON
 
 
@@ -46,27 +47,92 @@ class SupplyChainReport(SQLModel, table=True):
     
     # Relationship to task status
     task_status: Optional["TaskStatus"] = Relationship(back_populates="report")
+    
+    # Normalized copies of risk_metrics / sources for indexed queries
+    metric_rows: List["RiskMetric"] = Relationship(back_populates="report")
+    source_rows: List["ReportSource"] = Relationship(back_populates="report")
+
+
+# Normalized report children (the JSON columns remain the rendering source)
+class RiskMetric(SQLModel, table=True):
+    __tablename__ = "risk_metrics"
+    __table_args__ = (
+        # "all Labor risks with impact >= 8 this month"
+        Index("ix_risk_metrics_category_created_at_impact", "category", "created_at", "impact_score"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    report_id: int = Field(foreign_key="supply_chain_reports.id", index=True)
+    category: str
+    impact_score: int
+    description: str = ""
+    created_at: datetime  # copied from the report
+    
+    report: Optional[SupplyChainReport] = Relationship(back_populates="metric_rows")
+
+
+class ReportSource(SQLModel, table=True):
+    __tablename__ = "report_sources"
+    __table_args__ = (
+        Index("ix_report_sources_domain_created_at", "domain", "created_at"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    report_id: int = Field(foreign_key="supply_chain_reports.id", index=True)
+    url: str = Field(index=True)
+    domain: str  # hostname without "www."
+    title: Optional[str] = None
+    created_at: datetime  # copied from the report
+    
+    report: Optional[SupplyChainReport] = Relationship(back_populates="source_rows")
 
 
 # Task Status Model
 class TaskStatus(SQLModel, table=True):
     __tablename__ = "task_statuses"
+    __table_args__ = (
+        # Keyset pagination of the task list, with and without a status filter
+        Index("ix_task_statuses_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_task_statuses_created_at_id", "created_at", "id"),
+        # Recent run durations per task type (queue ETAs)
+        Index("ix_task_statuses_task_type_status_completed_at", "task_type", "status", "completed_at"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     task_id: UUID = Field(default_factory=uuid4, unique=True, index=True)
     task_type: TaskTypeEnum = Field(default=TaskTypeEnum.MANUAL)
     industry: str = Field(index=True)
     
+    # Analyst who requested the run (None for scheduled runs)
+    user_id: Optional[int] = Field(default=None, foreign_key="users.id", index=True)
+    
     status: TaskStatusEnum = Field(default=TaskStatusEnum.PENDING, index=True)
     progress: int = Field(default=0)
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # When the run was sent to the broker; None while held back by the fair-share limits
+    dispatched_at: Optional[datetime] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     
     error_message: Optional[str] = None
     retry_count: int = Field(default=0)
     
+    # Executive summary streamed from the analyst while the task is running
+    partial_summary: Optional[str] = None
+    
+    # Analyst context size before/after compaction (approximate tokens)
+    context_tokens_raw: Optional[int] = None
+    context_tokens_compacted: Optional[int] = None
+    
+    # Wall time of each stage in the last attempt (seconds) and the slowest one
+    researcher_seconds: Optional[float] = None
+    compactor_seconds: Optional[float] = None
+    analyst_seconds: Optional[float] = None
+    save_seconds: Optional[float] = None
+    slowest_stage: Optional[str] = None
+    slowest_stage_seconds: Optional[float] = Field(default=None, index=True)
+    
     # Foreign key to report
     report_id: Optional[int] = Field(default=None, foreign_key="supply_chain_reports.id")
     report: Optional[SupplyChainReport] = Relationship(back_populates="task_status")
@@ -87,3 +153,46 @@ class TaskStatus(SQLModel, table=True):
         elif self.started_at:
             return (datetime.utcnow() - self.started_at).total_seconds()
         return None
+
+
+# Risk trend rollups, maintained incrementally as reports are saved
+class IndustryRiskDaily(SQLModel, table=True):
+    __tablename__ = "industry_risk_daily"
+    
+    industry_key: str = Field(primary_key=True)  # lowercased industry
+    day: date = Field(primary_key=True)
+    industry: str  # display name from the latest report
+    report_count: int = Field(default=0)
+    fragility_sum: int = Field(default=0)
+    fragility_min: int
+    fragility_max: int
+    last_report_at: datetime
+    
+    @property
+    def fragility_avg(self) -> float:
+        return self.fragility_sum / self.report_count if self.report_count else 0.0
+
+
+class IndustryCategoryDaily(SQLModel, table=True):
+    __tablename__ = "industry_category_daily"
+    
+    industry_key: str = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    category: str = Field(primary_key=True)
+    metric_count: int = Field(default=0)
+    impact_sum: int = Field(default=0)
+    
+    @property
+    def impact_avg(self) -> float:
+        return self.impact_sum / self.metric_count if self.metric_count else 0.0
+
+
+# Int8-quantized report vectors for similarity search (see app/similarity.py)
+class ReportEmbedding(SQLModel, table=True):
+    __tablename__ = "report_embeddings"
+    
+    report_id: int = Field(foreign_key="supply_chain_reports.id", primary_key=True)
+    industry: str
+    model: str
+    vector: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    created_at: datetime  # copied from the report
@@ -0,0 +1,222 @@
+"""
+Task progress reporting for Celery research tasks
+
+Live progress (and the streamed partial summary) lives in Redis and is
+pushed to dashboards as task events. Postgres only receives status
+transitions (start, completion, failure) plus an occasional coalesced
+checkpoint of the live values, each as a single targeted UPDATE.
+"""
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+from sqlalchemy import case, func, update
+from app.cache import get_async_redis, get_redis
+from app.config import get_settings
+from app.database import engine
+from app.events import publish_task_event
+from app.metrics import DB_COMMIT_SECONDS
+from app.models import TaskStatus, TaskStatusEnum
+
+settings = get_settings()
+
+LIVE_KEY_PREFIX = "task-progress"
+
+# Stages timed per task, each stored as <stage>_seconds on TaskStatus
+STAGES = ("researcher", "compactor", "analyst", "save")
+
+
+def _live_key(task_id: str) -> str:
+    return f"{LIVE_KEY_PREFIX}:{task_id}"
+
+
+class ProgressReporter:
+    """Coalesces progress updates for one task"""
+
+    def __init__(self, task_id: str, industry: str):
+        self.task_id = str(task_id)
+        self.industry = industry
+        self.progress = 0
+        self.partial_summary: Optional[str] = None
+        self._persisted_at = time.monotonic()
+        self._dirty = False
+        self.timings: Dict[str, float] = {}
+        self._stage_started = time.monotonic()
+
+    def _write(self, **values) -> int:
+        """Apply a targeted UPDATE to this task's row"""
+        statement = (
+            update(TaskStatus)
+            .where(TaskStatus.task_id == UUID(self.task_id))
+            .values(**values)
+        )
+        with DB_COMMIT_SECONDS.labels("task_status").time(), engine.begin() as conn:
+            return conn.execute(statement).rowcount
+
+    def _set_live(self) -> bool:
+        """Store the live progress in Redis; False when Redis is unavailable"""
+        live = {"progress": self.progress, "partial_summary": self.partial_summary or ""}
+        try:
+            get_redis().set(
+                _live_key(self.task_id),
+                json.dumps(live),
+                ex=settings.progress_live_ttl_seconds
+            )
+            return True
+        except Exception as exc:
+            print(f"--- LIVE PROGRESS UNAVAILABLE ({exc}) ---")
+            return False
+
+    def _clear_live(self):
+        try:
+            get_redis().delete(_live_key(self.task_id))
+        except Exception:
+            pass
+
+    def start(self, progress: int = 10) -> bool:
+        """
+        Mark the task PROCESSING; False when the task no longer exists
+
+        A retry keeps the progress, started_at and stage timings of earlier
+        attempts, so a run resumed from a checkpoint doesn't jump back to the
+        start or look shorter than it was.
+        """
+        statement = (
+            update(TaskStatus)
+            .where(TaskStatus.task_id == UUID(self.task_id))
+            .values(
+                status=TaskStatusEnum.PROCESSING,
+                started_at=func.coalesce(TaskStatus.started_at, datetime.utcnow()),
+                progress=case((TaskStatus.progress > progress, TaskStatus.progress), else_=progress)
+            )
+            .returning(TaskStatus.progress, *(getattr(TaskStatus, f"{stage}_seconds") for stage in STAGES))
+        )
+        with DB_COMMIT_SECONDS.labels("task_status").time(), engine.begin() as conn:
+            row = conn.execute(statement).first()
+        if row is None:
+            return False
+
+        self.progress = row[0]
+        self.timings = {stage: seconds for stage, seconds in zip(STAGES, row[1:]) if seconds is not None}
+        self._set_live()
+        publish_task_event(self.task_id, TaskStatusEnum.PROCESSING.value, self.progress, self.industry)
+        return True
+
+    def update(self, progress: int, partial_summary: Optional[str] = None):
+        """
+        Record live progress
+
+        Progress never goes backwards. An event is published only when the
+        percentage changes; the database is only touched when the last
+        checkpoint is older than ``progress_persist_interval_seconds`` (or
+        when Redis is down and the database is the only place to keep it).
+        """
+        progress = max(progress, self.progress)
+        changed = progress != self.progress
+        summary_changed = partial_summary is not None and partial_summary != self.partial_summary
+        if not changed and not summary_changed:
+            return
+
+        self.progress = progress
+        if summary_changed:
+            self.partial_summary = partial_summary
+        self._dirty = True
+
+        live = self._set_live()
+        if changed:
+            publish_task_event(
+                self.task_id, TaskStatusEnum.PROCESSING.value, progress, self.industry, progress_only=True
+            )
+
+        interval = settings.progress_persist_interval_seconds
+        if not live or (interval and time.monotonic() - self._persisted_at >= interval):
+            self.flush()
+
+    def begin_stages(self):
+        """Start timing stages from now (the graph run begins)"""
+        self._stage_started = time.monotonic()
+
+    def end_stage(self, stage: str):
+        """Record the time since the previous stage ended (or stages began)"""
+        now = time.monotonic()
+        self.record_stage(stage, now - self._stage_started)
+        self._stage_started = now
+
+    def record_stage(self, stage: str, seconds: float):
+        self.timings[stage] = round(self.timings.get(stage, 0.0) + seconds, 3)
+
+    def _timing_fields(self) -> dict:
+        """TaskStatus columns for the recorded stage timings"""
+        timings = {stage: seconds for stage, seconds in self.timings.items() if stage in STAGES}
+        if not timings:
+            return {}
+        slowest = max(timings, key=timings.get)
+        return {
+            **{f"{stage}_seconds": seconds for stage, seconds in timings.items()},
+            "slowest_stage": slowest,
+            "slowest_stage_seconds": timings[slowest]
+        }
+
+    def flush(self):
+        """Persist the coalesced live values"""
+        if not self._dirty:
+            return
+        self._write(progress=self.progress, partial_summary=self.partial_summary)
+        self._persisted_at = time.monotonic()
+        self._dirty = False
+
+    def complete(self, report_id: int, **fields):
+        """Mark the task COMPLETED with its report"""
+        self.progress = 100
+        self._write(
+            status=TaskStatusEnum.COMPLETED,
+            progress=100,
+            completed_at=datetime.utcnow(),
+            report_id=report_id,
+            partial_summary=None,
+            error_message=None,
+            **self._timing_fields(),
+            **fields
+        )
+        self._clear_live()
+        publish_task_event(self.task_id, TaskStatusEnum.COMPLETED.value, 100, self.industry, report_id)
+
+    def retrying(self, exc: Exception, attempt: int, countdown: float):
+        """Record a failed attempt that will be retried; the task stays PROCESSING"""
+        self.flush()
+        self._write(
+            retry_count=attempt,
+            error_message=f"Attempt {attempt} failed, retrying in {countdown:.0f}s: {exc}",
+            # Stages finished so far; the next attempt adds to them
+            **self._timing_fields()
+        )
+        publish_task_event(self.task_id, TaskStatusEnum.PROCESSING.value, self.progress, self.industry)
+
+    def fail(self, exc: Exception):
+        """Mark the task FAILED"""
+        self._write(
+            status=TaskStatusEnum.FAILED,
+            progress=self.progress,
+            error_message=str(exc),
+            completed_at=datetime.utcnow()
+        )
+        self._clear_live()
+        publish_task_event(self.task_id, TaskStatusEnum.FAILED.value, self.progress, self.industry)
+
+
+async def get_live_progress(task_ids: Iterable[str]) -> Dict[str, dict]:
+    """Fetch live progress for running tasks from Redis, keyed by task id"""
+    task_ids = [str(task_id) for task_id in task_ids]
+    if not task_ids:
+        return {}
+    try:
+        values = await get_async_redis().mget([_live_key(task_id) for task_id in task_ids])
+    except Exception as exc:
+        print(f"--- LIVE PROGRESS UNAVAILABLE ({exc}) ---")
+        return {}
+    return {
+        task_id: json.loads(value)
+        for task_id, value in zip(task_ids, values)
+        if value is not None
+    }
@@ -0,0 +1,278 @@
+"""
+Search and LLM providers for the research agent
+
+``research_provider = "live"`` uses Tavily and Gemini. ``"fake"`` swaps in
+deterministic offline stand-ins: canned search results derived from the
+query, and analyst output derived from the research text, each after a
+configurable latency and failing at a configurable rate. The fakes let the
+pipeline (graph, Celery, database, progress events) run and be measured
+without API keys or provider latency. Clients are built on first use and
+reused by the process; provider SDKs are only imported for live clients.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import List, Optional
+from app.compaction import estimate_tokens
+from app.config import get_settings
+from app.metrics import record_llm_tokens
+
+settings = get_settings()
+
+FAKE_HEADLINES = [
+    "Port congestion pushes container dwell times to a six-month high",
+    "Dockworkers vote to extend strike at two major terminals",
+    "New export controls tighten supply of critical components",
+    "Tariff increase announced on key imported inputs",
+    "Supplier plant outage cuts regional output by a third",
+    "Freight rates climb as carriers blank sailings",
+    "Labor shortage slows production at tier-two suppliers",
+    "Raw material prices spike after mine closure",
+]
+
+FAKE_CATEGORIES = ["Logistics", "Labor", "Geopolitical", "Raw Materials"]
+
+
+class FakeProviderError(ConnectionError):
+    """Injected provider failure (a ConnectionError, so retried as transient)"""
+
+
+def _digest(*parts: str) -> int:
+    return int.from_bytes(hashlib.sha256("|".join(parts).encode()).digest()[:8], "big")
+
+
+class _FakeBehaviour:
+    """Latency and failure injection shared by the fakes"""
+
+    def __init__(self, latency: float, failure_rate: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self) -> tuple:
+        """(delay seconds, whether this call fails)"""
+        with self._lock:
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+            return max(0.0, delay), self._random.random() < self.failure_rate
+
+    def _fail(self, name: str):
+        raise FakeProviderError(f"Injected {name} failure")
+
+
+class FakeSearchClient(_FakeBehaviour):
+    """Offline Tavily stand-in returning canned results for a query"""
+
+    def _results(self, query: str, max_results: int = 5, **params) -> dict:
+        results = []
+        for rank in range(max_results):
+            value = _digest(query, str(rank))
+            headline = FAKE_HEADLINES[value % len(FAKE_HEADLINES)]
+            results.append({
+                "url": f"https://news.example.com/{value % 10 ** 8}",
+                "title": headline,
+                "content": f"{headline}. Analysts following {query} expect delays of {2 + value % 10} weeks.",
+                "score": round(0.95 - rank * 0.1, 2)
+            })
+        return {"query": query, "results": results}
+
+    def search(self, query: str, **params) -> dict:
+        delay, fails = self._draw()
+        time.sleep(delay)
+        if fails:
+            self._fail("search")
+        return self._results(query, **params)
+
+
+class FakeAsyncSearchClient(FakeSearchClient):
+    """Async FakeSearchClient"""
+
+    async def search(self, query: str, **params) -> dict:
+        delay, fails = self._draw()
+        await asyncio.sleep(delay)
+        if fails:
+            self._fail("search")
+        return self._results(query, **params)
+
+
+class FakeChatModel(_FakeBehaviour):
+    """
+    Offline Gemini stand-in answering with analyst JSON derived from the prompt
+
+    Like the live model it returns message text (a fenced JSON block), and
+    stream/astream yield it in STREAM_CHUNKS pieces for the caller to parse.
+    """
+
+    model = "fake-analyst"
+    STREAM_CHUNKS = 4
+
+    def _output(self, messages: List[dict]) -> dict:
+        system, research = messages[0]["content"], messages[-1]["content"]
+        match = re.search(r"regarding the (.+?) industry", system)
+        industry = match.group(1) if match else "Global"
+        value = _digest(industry, research)
+        urls = re.findall(r"^Source: (\S+)", research, flags=re.MULTILINE)[:3]
+        return {
+            "executive_summary": (
+                f"{industry} supply chains face elevated disruption risk: "
+                f"{FAKE_HEADLINES[value % len(FAKE_HEADLINES)].lower()}."
+            ),
+            "fragility_score": 1 + value % 10,
+            "risk_metrics": [
+                {
+                    "category": category,
+                    "impact_score": 1 + (value >> (4 * index)) % 10,
+                    "description": f"{category} exposure in {industry}"
+                }
+                for index, category in enumerate(FAKE_CATEGORIES)
+            ],
+            "critical_alerts": [FAKE_HEADLINES[(value >> 8) % len(FAKE_HEADLINES)]],
+            "sources": [{"url": url, "title": url} for url in urls]
+        }
+
+    def _text(self, messages: List[dict]) -> str:
+        """The answer as the model would write it"""
+        return f"```json\n{json.dumps(self._output(messages), indent=2)}\n```"
+
+    def _record_tokens(self, messages: List[dict], text: str):
+        """Token metrics as a live model would report them (estimated)"""
+        prompt = sum(estimate_tokens(message["content"]) for message in messages)
+        record_llm_tokens(self.model, prompt, estimate_tokens(text))
+
+    def _pieces(self, text: str) -> List[str]:
+        size = -(-len(text) // self.STREAM_CHUNKS)
+        return [text[start:start + size] for start in range(0, len(text), size)]
+
+    def invoke(self, messages: List[dict], *args, **kwargs):
+        from langchain_core.messages import AIMessage
+        delay, fails = self._draw()
+        time.sleep(delay)
+        if fails:
+            self._fail("LLM")
+        text = self._text(messages)
+        self._record_tokens(messages, text)
+        return AIMessage(content=text)
+
+    def batch(self, inputs: List[List[dict]], *args, return_exceptions: bool = False, **kwargs) -> list:
+        results = []
+        for messages in inputs:
+            try:
+                results.append(self.invoke(messages))
+            except Exception as exc:
+                if not return_exceptions:
+                    raise
+                results.append(exc)
+        return results
+
+    def stream(self, messages: List[dict], *args, **kwargs):
+        from langchain_core.messages import AIMessageChunk
+        delay, fails = self._draw()
+        text = self._text(messages)
+        *pieces, last = self._pieces(text)
+        for piece in pieces:
+            time.sleep(delay / self.STREAM_CHUNKS)
+            yield AIMessageChunk(content=piece)
+        time.sleep(delay / self.STREAM_CHUNKS)
+        if fails:
+            self._fail("LLM")
+        self._record_tokens(messages, text)
+        yield AIMessageChunk(content=last)
+
+    async def astream(self, messages: List[dict], *args, **kwargs):
+        from langchain_core.messages import AIMessageChunk
+        delay, fails = self._draw()
+        text = self._text(messages)
+        *pieces, last = self._pieces(text)
+        for piece in pieces:
+            await asyncio.sleep(delay / self.STREAM_CHUNKS)
+            yield AIMessageChunk(content=piece)
+        await asyncio.sleep(delay / self.STREAM_CHUNKS)
+        if fails:
+            self._fail("LLM")
+        self._record_tokens(messages, text)
+        yield AIMessageChunk(content=last)
+
+
+_search_client = None
+_async_search_client = None
+_chat_model = None
+_lock = threading.Lock()
+
+
+def _fake_behaviour(latency: float) -> dict:
+    return {
+        "latency": latency,
+        "failure_rate": settings.fake_provider_failure_rate,
+        "jitter": settings.fake_provider_jitter,
+        "seed": settings.fake_provider_seed
+    }
+
+
+def get_search_client():
+    """Get the process-wide search client (Tavily or fake)"""
+    global _search_client
+    with _lock:
+        if _search_client is None:
+            if settings.research_provider == "fake":
+                _search_client = FakeSearchClient(**_fake_behaviour(settings.fake_search_latency_seconds))
+            else:
+                from tavily import TavilyClient
+                _search_client = TavilyClient(api_key=settings.tavily_api_key)
+        return _search_client
+
+
+def get_async_search_client():
+    """Get the process-wide async search client (Tavily or fake)"""
+    global _async_search_client
+    with _lock:
+        if _async_search_client is None:
+            if settings.research_provider == "fake":
+                _async_search_client = FakeAsyncSearchClient(**_fake_behaviour(settings.fake_search_latency_seconds))
+            else:
+                from tavily import AsyncTavilyClient
+                _async_search_client = AsyncTavilyClient(api_key=settings.tavily_api_key)
+        return _async_search_client
+
+
+def get_chat_model():
+    """Get the process-wide analyst chat model (Gemini or fake)"""
+    global _chat_model
+    with _lock:
+        if _chat_model is None:
+            if settings.research_provider == "fake":
+                _chat_model = FakeChatModel(**_fake_behaviour(settings.fake_llm_latency_seconds))
+            else:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                _chat_model = ChatGoogleGenerativeAI(
+                    model="gemini-2.0-flash-exp",
+                    temperature=0,
+                    google_api_key=settings.google_api_key
+                )
+        return _chat_model
+
+
+def cache_scope(client) -> tuple:
+    """Extra cache-key parts that keep fake results apart from live ones"""
+    return ("fake",) if isinstance(client, _FakeBehaviour) else ()
+
+
+def install_fake_providers(
+    search_latency: float,
+    llm_latency: float,
+    failure_rate: float = 0.0,
+    jitter: float = 0.0,
+    seed: Optional[int] = None
+):
+    """Replace this process's clients with fakes (benchmarks; overrides research_provider)"""
+    global _search_client, _async_search_client, _chat_model
+    seed = settings.fake_provider_seed if seed is None else seed
+    behaviour = {"failure_rate": failure_rate, "jitter": jitter, "seed": seed}
+    with _lock:
+        _search_client = FakeSearchClient(latency=search_latency, **behaviour)
+        _async_search_client = FakeAsyncSearchClient(latency=search_latency, **behaviour)
+        _chat_model = FakeChatModel(latency=llm_latency, **behaviour)
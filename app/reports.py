@@ -0,0 +1,132 @@
+"""
+Report rendering, caching and normalized details
+
+Reports never change once a research task has written them, so the
+rendered report_detail fragment is cached by report id and template
+version: a bounded in-process LRU in each web process, backed by an
+optional shared Redis tier that the Celery worker pre-warms as soon as a
+report is saved.
+
+The risk_metrics and sources JSON columns are also written out as
+RiskMetric / ReportSource rows so they can be queried through indexes.
+"""
+import hashlib
+from typing import List, Optional
+from urllib.parse import urlparse
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import SharedCache
+from app.config import get_settings
+from app.models import ReportSource, RiskMetric, SupplyChainReport
+
+settings = get_settings()
+
+# Plain Jinja environment so the worker can render without a request
+_env = Environment(
+    loader=FileSystemLoader("app/templates"),
+    autoescape=select_autoescape(["html", "xml"])
+)
+
+REPORT_TEMPLATE = "components/report_detail.html"
+
+
+def _template_version() -> str:
+    """Short hash of the report template, so a deploy that changes it misses old entries"""
+    source, _, _ = _env.loader.get_source(_env, REPORT_TEMPLATE)
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+REPORT_TEMPLATE_VERSION = _template_version()
+
+report_html_cache = SharedCache(
+    "report-html",
+    ttl_seconds=settings.report_html_cache_ttl_seconds,
+    max_local_entries=settings.report_html_cache_max_entries,
+    shared=settings.report_html_cache_shared,
+    local_ttl_seconds=None  # reports are write-once
+)
+
+
+def normalize_category(category: str) -> str:
+    return " ".join(category.split()).title()
+
+
+def source_domain(url: str) -> str:
+    """Hostname of a source URL, lowercased and without a leading www."""
+    host = (urlparse(url).hostname or "").lower()
+    return host.removeprefix("www.")
+
+
+def report_details(report: SupplyChainReport) -> List:
+    """Build the normalized RiskMetric / ReportSource rows for a saved report"""
+    rows = []
+    for metric in report.risk_metrics or []:
+        if not metric.get("category"):
+            continue
+        rows.append(RiskMetric(
+            report_id=report.id,
+            category=normalize_category(metric["category"]),
+            impact_score=int(metric.get("impact_score") or 0),
+            description=metric.get("description") or "",
+            created_at=report.created_at
+        ))
+    for source in report.sources or []:
+        if not source.get("url"):
+            continue
+        rows.append(ReportSource(
+            report_id=report.id,
+            url=source["url"],
+            domain=source_domain(source["url"]),
+            title=source.get("title"),
+            created_at=report.created_at
+        ))
+    return rows
+
+
+def format_report(report: SupplyChainReport) -> dict:
+    """Format a report for the report_detail template"""
+    return {
+        "id": report.id,
+        "industry": report.industry,
+        "fragility_score": report.fragility_score,
+        "executive_summary": report.executive_summary,
+        "critical_alerts": report.critical_alerts,
+        "risk_metrics": report.risk_metrics,
+        "sources": report.sources,
+        "created_at": report.created_at.strftime("%B %d, %Y at %I:%M %p")
+    }
+
+
+def render_report_html(report: SupplyChainReport) -> str:
+    """Render the report_detail fragment for a saved report"""
+    return _env.get_template(REPORT_TEMPLATE).render(report=format_report(report))
+
+
+def _cache_key(report_id: int) -> str:
+    return f"{REPORT_TEMPLATE_VERSION}:{report_id}"
+
+
+def warm_report_html(report: SupplyChainReport):
+    """Render a freshly saved report into the shared cache (best effort)"""
+    if not report_html_cache.shared:
+        # The worker's in-process tier is never read by a web process
+        return
+    try:
+        report_html_cache.set(_cache_key(report.id), render_report_html(report))
+    except Exception as exc:
+        print(f"--- FAILED TO PRE-RENDER REPORT {report.id}: {exc} ---")
+
+
+async def get_report_html(session: AsyncSession, report_id: int) -> Optional[str]:
+    """Return the rendered report fragment, rendering and caching it on a miss"""
+    html = await report_html_cache.aget(_cache_key(report_id))
+    if html is not None:
+        return html
+    
+    report = await session.get(SupplyChainReport, report_id)
+    if not report:
+        return None
+    
+    html = render_report_html(report)
+    await report_html_cache.aset(_cache_key(report_id), html)
+    return html
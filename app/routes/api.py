@@ -1,35 +1,82 @@
-from uuid import uuid4
+import asyncio
+import base64
+import math
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
 from typing import Optional
 from fastapi import APIRouter, Request, Depends, Form, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
-from app.database import get_session
+from redis.exceptions import LockError
+from sqlalchemy import tuple_
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
+from app.analytics import get_industry_trend, list_industries, normalize_industry
 from app.auth import require_auth
-from app.models import TaskStatus, SupplyChainReport, TaskStatusEnum, TaskTypeEnum
-from app.tasks import run_research_task
+from app.cache import get_async_redis
+from app.config import get_settings
+from app.events import apublish_task_event, broadcaster, task_event_name
+from app.http_cache import make_etag, not_modified, tag_response
+from app.models import ReportSource, RiskMetric, TaskStatus, SupplyChainReport, TaskStatusEnum, TaskTypeEnum
+from app.progress import get_live_progress
+from app.reports import REPORT_TEMPLATE_VERSION, get_report_html, normalize_category, source_domain
+from app.scheduler import arelease_held_research, queue_status
+from app.search import search_reports
+from app.similarity import report_index
 
 router = APIRouter(prefix="/api")
 templates = Jinja2Templates(directory="app/templates")
+settings = get_settings()
+
+
+def encode_cursor(created_at: datetime, task_pk: int) -> str:
+    """Opaque keyset cursor for the task list"""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{task_pk}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a task list cursor into (created_at, id)"""
+    try:
+        created_at, task_pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(task_pk)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.get("/tasks", response_class=HTMLResponse)
 async def get_tasks(
     request: Request,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     status: Optional[str] = None,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: int = 50
 ):
-    """Get list of tasks (HTMX endpoint)"""
-    require_auth(request, session)
+    """Get a page of tasks, newest first (HTMX endpoint, keyset-paginated)"""
+    await require_auth(request, session)
+    limit = max(1, min(limit, 100))
     
-    # Build query
-    statement = select(TaskStatus).order_by(TaskStatus.created_at.desc()).limit(limit)
+    # Build query; (created_at, id) ordering is served by the composite indexes
+    statement = (
+        select(TaskStatus)
+        .order_by(TaskStatus.created_at.desc(), TaskStatus.id.desc())
+        .limit(limit + 1)
+    )
     
     if status:
         statement = statement.where(TaskStatus.status == TaskStatusEnum(status))
     
-    tasks = session.exec(statement).all()
+    if cursor:
+        statement = statement.where(tuple_(TaskStatus.created_at, TaskStatus.id) < decode_cursor(cursor))
+    
+    tasks = (await session.exec(statement)).all()
+    next_cursor = encode_cursor(tasks[limit - 1].created_at, tasks[limit - 1].id) if len(tasks) > limit else None
+    tasks = tasks[:limit]
+    
+    # Running tasks report live progress through Redis rather than the database
+    live = await get_live_progress(
+        task.task_id for task in tasks if task.status == TaskStatusEnum.PROCESSING
+    )
     
     # Format tasks for template
     formatted_tasks = []
@@ -38,95 +85,466 @@ async def get_tasks(
             "task_id": str(task.task_id),
             "industry": task.industry,
             "status": task.status.value,
-            "progress": task.progress,
+            "progress": live.get(str(task.task_id), {}).get("progress", task.progress),
             "created_at": task.created_at.strftime("%b %d, %Y %I:%M %p"),
             "error_message": task.error_message,
             "report_id": task.report_id
         })
     
-    return templates.TemplateResponse(
+    # The fragment is a pure function of these rows, so unchanged polls skip Jinja
+    etag = make_etag(
+        [tuple(task.values()) for task in formatted_tasks],
+        status, limit, cursor, next_cursor
+    )
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    response = templates.TemplateResponse(
         "components/task_list.html",
-        {"request": request, "tasks": formatted_tasks}
+        {
+            "request": request,
+            "tasks": formatted_tasks,
+            "status": status or "",
+            "limit": limit,
+            "cursor": cursor,
+            "next_cursor": next_cursor
+        }
+    )
+    return tag_response(response, etag)
+
+
+@router.get("/tasks/stream")
+async def stream_task_events(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Push task state changes to the dashboard (server-sent events)"""
+    await require_auth(request, session)
+    await session.close()
+
+    async def event_stream():
+        queue = broadcaster.subscribe()
+        try:
+            while not await request.is_disconnected():
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=settings.sse_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {task_event_name(data)}\ndata: {data}\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def find_reusable_research(session: AsyncSession, industry: str) -> Optional[dict]:
+    """Find an active task or a fresh report that a new request can attach to"""
+    industry_key = normalize_industry(industry)
+    now = datetime.utcnow()
+    
+    statement = (
+        select(TaskStatus)
+        .where(func.lower(TaskStatus.industry) == industry_key)
+        .where(TaskStatus.status.in_([TaskStatusEnum.PENDING, TaskStatusEnum.PROCESSING]))
+        .where(TaskStatus.created_at >= now - timedelta(minutes=settings.research_active_task_max_age_minutes))
+        .order_by(TaskStatus.created_at.desc())
+    )
+    active = (await session.exec(statement)).first()
+    if active:
+        return {
+            "task_id": str(active.task_id),
+            "industry": active.industry,
+            "status": active.status.value,
+            "report_id": None,
+            "deduplicated": True
+        }
+    
+    statement = (
+        select(TaskStatus)
+        .where(func.lower(TaskStatus.industry) == industry_key)
+        .where(TaskStatus.status == TaskStatusEnum.COMPLETED)
+        .where(TaskStatus.report_id.is_not(None))
+        .where(TaskStatus.completed_at >= now - timedelta(minutes=settings.research_reuse_window_minutes))
+        .order_by(TaskStatus.completed_at.desc())
     )
+    completed = (await session.exec(statement)).first()
+    if completed:
+        return {
+            "task_id": str(completed.task_id),
+            "industry": completed.industry,
+            "status": completed.status.value,
+            "report_id": completed.report_id,
+            "deduplicated": True
+        }
+    
+    return None
 
 
 @router.post("/research")
 async def create_research(
     request: Request,
     industry: str = Form(...),
-    session: Session = Depends(get_session)
+    force: bool = Form(False),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Create a new research task (HTMX endpoint)"""
-    require_auth(request, session)
-    
-    # Create task status record
-    task_id = uuid4()
-    task_status = TaskStatus(
-        task_id=task_id,
-        task_type=TaskTypeEnum.MANUAL,
-        industry=industry,
-        status=TaskStatusEnum.PENDING
+    """Create a new research task, or attach to matching in-flight/fresh work (HTMX endpoint)"""
+    user = await require_auth(request, session)
+    
+    # Stored as entered minus surrounding whitespace; matched case-insensitively
+    industry = industry.strip()
+    if not industry:
+        raise HTTPException(status_code=400, detail="Industry is required")
+    
+    existing = await find_reusable_research(session, industry)
+    if existing:
+        return existing
+    
+    # Offer a recent report for a similarly named industry before spending an agent run.
+    # Runs before the lock: a cold process loads the whole index here.
+    if settings.research_similarity_precheck and not force:
+        since = datetime.utcnow() - timedelta(hours=settings.research_similarity_window_hours)
+        similar = await report_index.similar_recent_industry(session, industry, since)
+        if similar:
+            return {
+                "task_id": None,
+                "industry": industry,
+                "status": "SIMILAR",
+                "report_id": similar["report_id"],
+                "similar_industry": similar["industry"],
+                "similarity": similar["score"],
+                "deduplicated": False
+            }
+    
+    # The lock makes check-then-insert atomic across uvicorn workers
+    lock = get_async_redis().lock(
+        f"research-lock:{normalize_industry(industry)}",
+        timeout=10,
+        blocking_timeout=5
     )
+    if not await lock.acquire():
+        raise HTTPException(status_code=503, detail="Research request busy, please retry")
+    try:
+        existing = await find_reusable_research(session, industry)
+        if existing:
+            return existing
+        
+        # Create task status record
+        task_id = uuid4()
+        task_status = TaskStatus(
+            task_id=task_id,
+            task_type=TaskTypeEnum.MANUAL,
+            industry=industry,
+            user_id=user.id,
+            status=TaskStatusEnum.PENDING
+        )
+        
+        session.add(task_status)
+        await session.commit()
+    finally:
+        try:
+            await lock.release()
+        except LockError as exc:
+            # The lock expired first; the task row (if any) is committed regardless
+            print(f"--- RESEARCH LOCK FOR {industry} EXPIRED BEFORE RELEASE: {exc} ---")
     
-    session.add(task_status)
-    session.commit()
+    await apublish_task_event(task_id, TaskStatusEnum.PENDING.value, 0, industry)
     
-    # Queue the Celery task
-    run_research_task.delay(str(task_id), industry)
+    # Queue the Celery task now, or hold it until the fair-share scheduler frees a slot.
+    # The task exists either way; if this fails, the beat job dispatches it later.
+    try:
+        released = await arelease_held_research(session)
+    except Exception as exc:
+        print(f"--- FAILED TO RELEASE HELD RESEARCH: {exc} ---")
+        released = []
+    held = not any(row.task_id == task_id for row in released)
     
-    return {"task_id": str(task_id), "industry": industry, "status": "PENDING"}
+    return {
+        "task_id": str(task_id),
+        "industry": industry,
+        "status": "PENDING",
+        "report_id": None,
+        "deduplicated": False,
+        "held": held
+    }
 
 
 @router.get("/report/{report_id}", response_class=HTMLResponse)
 async def get_report(
     report_id: int,
     request: Request,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Get report details (HTMX endpoint)"""
-    require_auth(request, session)
+    """Get report details (HTMX endpoint, served from the rendered-fragment cache)"""
+    await require_auth(request, session)
     
-    report = session.get(SupplyChainReport, report_id)
+    # Reports are immutable: check the client's copy before loading the JSON columns
+    statement = select(SupplyChainReport.created_at).where(SupplyChainReport.id == report_id)
+    created_at = (await session.exec(statement)).first()
     
-    if not report:
+    if not created_at:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    # Format report for template
+    etag = make_etag("report", report_id, created_at.isoformat(), REPORT_TEMPLATE_VERSION)
+    cached = not_modified(request, etag, created_at)
+    if cached:
+        return cached
+    
+    html = await get_report_html(session, report_id)
+    if html is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    return tag_response(HTMLResponse(html), etag, created_at)
+
+
+@router.get("/report/{report_id}/similar", response_class=HTMLResponse)
+async def get_similar_reports(
+    report_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Past reports closest to this one in the embedding index (HTMX endpoint)"""
+    await require_auth(request, session)
+    
+    similar = await report_index.similar_to_report(session, report_id)
+    for item in similar:
+        item["created_at"] = item["created_at"].strftime("%b %d, %Y")
+    
+    return templates.TemplateResponse(
+        "components/similar_reports.html",
+        {"request": request, "similar": similar}
+    )
+
+
+@router.get("/analytics", response_class=HTMLResponse)
+async def get_analytics(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    industry: Optional[str] = None,
+    days: int = settings.analytics_default_days
+):
+    """Risk trends for one industry, read from the daily rollups (HTMX endpoint)"""
+    await require_auth(request, session)
+    days = max(7, min(days, 365))
+    
+    industries = await list_industries(session)
+    if industry:
+        industry_key = normalize_industry(industry)
+    else:
+        industry_key = industries[0]["key"] if industries else None
+    
+    trend = await get_industry_trend(session, industry_key, days) if industry_key else None
+    
+    return templates.TemplateResponse(
+        "components/risk_trends.html",
+        {
+            "request": request,
+            "industries": industries,
+            "industry_key": industry_key,
+            "days": days,
+            "trend": trend
+        }
+    )
+
+
+@router.get("/reports/search", response_class=HTMLResponse)
+async def search_report_text(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    q: str = "",
+    page: int = 1,
+    limit: int = 20
+):
+    """Ranked full-text search over executive summaries and alerts (HTMX endpoint)"""
+    await require_auth(request, session)
+    page = max(1, page)
+    limit = max(1, min(limit, 50))
+    query = q.strip()
+    
+    results, has_more = await search_reports(session, query, limit, (page - 1) * limit) if query else ([], False)
+    
+    for result in results:
+        result["created_at"] = result["created_at"].strftime("%b %d, %Y")
+    
+    return templates.TemplateResponse(
+        "components/search_results.html",
+        {
+            "request": request,
+            "query": query,
+            "results": results,
+            "page": page,
+            "limit": limit,
+            "has_more": has_more
+        }
+    )
+
+
+@router.get("/risks")
+async def query_risks(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    category: Optional[str] = None,
+    min_impact: int = 0,
+    since: Optional[datetime] = None,
+    industry: Optional[str] = None,
+    limit: int = 100
+):
+    """Risk metrics across reports, filtered by category / impact / date (indexed on risk_metrics)"""
+    await require_auth(request, session)
+    
+    statement = (
+        select(RiskMetric, SupplyChainReport.industry)
+        .join(SupplyChainReport, SupplyChainReport.id == RiskMetric.report_id)
+        .where(RiskMetric.impact_score >= min_impact)
+        .order_by(RiskMetric.created_at.desc(), RiskMetric.id.desc())
+        .limit(max(1, min(limit, 500)))
+    )
+    if category:
+        statement = statement.where(RiskMetric.category == normalize_category(category))
+    if since:
+        statement = statement.where(RiskMetric.created_at >= since)
+    if industry:
+        statement = statement.where(func.lower(SupplyChainReport.industry) == industry.strip().lower())
+    
+    return [
+        {
+            "report_id": metric.report_id,
+            "industry": report_industry,
+            "category": metric.category,
+            "impact_score": metric.impact_score,
+            "description": metric.description,
+            "created_at": metric.created_at.isoformat()
+        }
+        for metric, report_industry in (await session.exec(statement)).all()
+    ]
+
+
+@router.get("/sources")
+async def query_sources(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    domain: Optional[str] = None,
+    url: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100
+):
+    """Reports citing a source URL or domain (indexed on report_sources)"""
+    await require_auth(request, session)
+    
+    if not domain and not url:
+        raise HTTPException(status_code=400, detail="Provide a domain or url")
+    
+    statement = (
+        select(ReportSource, SupplyChainReport.industry)
+        .join(SupplyChainReport, SupplyChainReport.id == ReportSource.report_id)
+        .order_by(ReportSource.created_at.desc(), ReportSource.id.desc())
+        .limit(max(1, min(limit, 500)))
+    )
+    if url:
+        statement = statement.where(ReportSource.url == url)
+    if domain:
+        # Accept "reuters.com", "www.reuters.com" or a full URL
+        statement = statement.where(ReportSource.domain == source_domain(domain if "//" in domain else f"//{domain}"))
+    if since:
+        statement = statement.where(ReportSource.created_at >= since)
+    
+    return [
+        {
+            "report_id": source.report_id,
+            "industry": report_industry,
+            "url": source.url,
+            "title": source.title,
+            "created_at": source.created_at.isoformat()
+        }
+        for source, report_industry in (await session.exec(statement)).all()
+    ]
+
+
+@router.get("/task/{task_id}/preview", response_class=HTMLResponse)
+async def get_task_preview(
+    task_id: str,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Show a running task's streamed executive summary, or its report once done (HTMX endpoint)"""
+    await require_auth(request, session)
+    
+    try:
+        task_uuid = UUID(task_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    statement = select(TaskStatus).where(TaskStatus.task_id == task_uuid)
+    task = (await session.exec(statement)).first()
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if task.report_id:
+        return await get_report(task.report_id, request, session)
+    
+    live = (await get_live_progress([task.task_id])).get(str(task.task_id), {})
+    queue = await queue_status(session, task)
+    
     formatted_report = {
-        "id": report.id,
-        "industry": report.industry,
-        "fragility_score": report.fragility_score,
-        "executive_summary": report.executive_summary,
-        "critical_alerts": report.critical_alerts,
-        "risk_metrics": report.risk_metrics,
-        "sources": report.sources,
-        "created_at": report.created_at.strftime("%B %d, %Y at %I:%M %p")
+        "partial": True,
+        "task_id": str(task.task_id),
+        "industry": task.industry,
+        "status": task.status.value,
+        "progress": live.get("progress", task.progress),
+        "error_message": task.error_message,
+        "executive_summary": live.get("partial_summary") or task.partial_summary or "",
+        "queue_position": queue["queue_position"],
+        # Whole minutes, so the ETag only changes when the shown ETA does
+        "eta_minutes": None if queue["eta_seconds"] is None else math.ceil(queue["eta_seconds"] / 60),
+        "sources": [],
+        "created_at": (task.started_at or task.created_at).strftime("%B %d, %Y at %I:%M %p")
     }
     
-    return templates.TemplateResponse(
+    etag = make_etag("preview", tuple(formatted_report.values()))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    response = templates.TemplateResponse(
         "components/report_detail.html",
         {"request": request, "report": formatted_report}
     )
+    return tag_response(response, etag)
 
 
 @router.get("/task/{task_id}/status")
 async def get_task_status(
     task_id: str,
     request: Request,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Get task status (for polling)"""
-    require_auth(request, session)
+    await require_auth(request, session)
     
-    statement = select(TaskStatus).where(TaskStatus.task_id == task_id)
-    task = session.exec(statement).first()
+    try:
+        task_uuid = UUID(task_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    statement = select(TaskStatus).where(TaskStatus.task_id == task_uuid)
+    task = (await session.exec(statement)).first()
     
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    live = (await get_live_progress([task.task_id])).get(str(task.task_id), {})
+    
     return {
         "task_id": str(task.task_id),
         "status": task.status.value,
-        "progress": task.progress,
-        "report_id": task.report_id
+        "progress": live.get("progress", task.progress),
+        "report_id": task.report_id,
+        **await queue_status(session, task)
     }
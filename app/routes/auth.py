@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Request, Response, Depends, Form, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
-from sqlmodel import Session
-from app.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.auth import authenticate_user, create_user, create_access_token, get_current_user_from_session
 from app.config import get_settings
 
@@ -15,10 +15,10 @@ async def login(
     response: Response,
     username: str = Form(...),
     password: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Handle user login"""
-    user = authenticate_user(session, username, password)
+    user = await authenticate_user(session, username, password)
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -46,11 +46,13 @@ async def signup(
     username: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Handle user signup"""
     try:
-        user = create_user(session, username, email, password)
+        user = await create_user(session, username, email, password)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session
-from app.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.auth import get_current_user_from_session, require_auth
 from app.models import User
 
@@ -11,9 +11,9 @@ templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/", response_class=HTMLResponse)
-async def index(request: Request, session: Session = Depends(get_session)):
+async def index(request: Request, session: AsyncSession = Depends(get_async_session)):
     """Home page - redirect to dashboard if authenticated, otherwise show auth page"""
-    user = get_current_user_from_session(request, session)
+    user = await get_current_user_from_session(request, session)
     
     if user:
         return templates.TemplateResponse("dashboard.html", {"request": request, "user": user})
@@ -22,7 +22,7 @@ async def index(request: Request, session: Session = Depends(get_session)):
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, session: Session = Depends(get_session)):
+async def dashboard(request: Request, session: AsyncSession = Depends(get_async_session)):
     """Dashboard page - requires authentication"""
-    user = require_auth(request, session)
+    user = await require_auth(request, session)
     return templates.TemplateResponse("dashboard.html", {"request": request, "user": user})
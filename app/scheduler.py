@@ -0,0 +1,251 @@
+"""
+Fair-share dispatch of manual research runs
+
+Each analyst may have research_user_max_active manual runs queued or running
+at once, and research_max_active bounds them across all analysts. Requests
+beyond the limits are stored PENDING but held back (dispatched_at is NULL).
+When a run finishes, and once a minute from Celery beat, held runs are
+released into the free slots: each slot goes to the user with the fewest
+active runs (oldest request first), so one user submitting many industries
+can't hold up everyone else. Scheduled runs and retries are never held;
+they have their own broker queues (app.dispatch).
+
+queue_status() reports a waiting task's position in its queue and an ETA
+based on the durations of recent runs of the same type.
+"""
+import asyncio
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from redis.exceptions import LockError
+from sqlalchemy import and_, func, or_, update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import TTLCache, get_async_redis, get_redis
+from app.config import get_settings
+from app.database import engine
+from app.dispatch import dispatch_research
+from app.models import TaskStatus, TaskStatusEnum, TaskTypeEnum
+
+settings = get_settings()
+
+DISPATCH_LOCK = "research-dispatch-lock"
+
+# Average run duration per task type, wrapped in a tuple so "no data" caches too
+_durations = TTLCache(max_entries=16, ttl_seconds=30)
+
+
+def _active_since() -> datetime:
+    """Runs dispatched before this are treated as abandoned (e.g. by a dead worker)"""
+    return datetime.utcnow() - timedelta(minutes=settings.research_active_task_max_age_minutes)
+
+
+def _held_statement():
+    """Held manual runs, oldest first"""
+    return (
+        select(TaskStatus.task_id, TaskStatus.industry, TaskStatus.user_id, TaskStatus.created_at)
+        .where(TaskStatus.task_type == TaskTypeEnum.MANUAL)
+        .where(TaskStatus.status == TaskStatusEnum.PENDING)
+        .where(TaskStatus.dispatched_at.is_(None))
+        .order_by(TaskStatus.created_at, TaskStatus.id)
+    )
+
+
+def _active_statement():
+    """Dispatched manual runs still queued or running, counted per user"""
+    return (
+        select(TaskStatus.user_id, func.count())
+        .where(TaskStatus.task_type == TaskTypeEnum.MANUAL)
+        .where(TaskStatus.status.in_([TaskStatusEnum.PENDING, TaskStatusEnum.PROCESSING]))
+        .where(TaskStatus.dispatched_at >= _active_since())
+        .group_by(TaskStatus.user_id)
+    )
+
+
+def _claim_statement(released: List):
+    return (
+        update(TaskStatus)
+        .where(TaskStatus.task_id.in_([row.task_id for row in released]))
+        .where(TaskStatus.dispatched_at.is_(None))
+        .values(dispatched_at=datetime.utcnow())
+    )
+
+
+def plan_dispatch(held: Iterable, active: Dict[Optional[int], int]) -> List:
+    """
+    Pick the held runs to release now
+
+    Slots are handed out one at a time to the user with the fewest active
+    runs, the oldest held request breaking ties, within the per-user and
+    overall limits.
+    """
+    per_user = settings.research_user_max_active
+    active = dict(active)
+    total = sum(active.values())
+    waiting = defaultdict(deque)
+    for row in held:
+        waiting[row.user_id].append(row)
+
+    released = []
+    while waiting:
+        if settings.research_max_active and total >= settings.research_max_active:
+            break
+        eligible = [user for user in waiting if not per_user or active.get(user, 0) < per_user]
+        if not eligible:
+            break
+        user = min(eligible, key=lambda user: (active.get(user, 0), waiting[user][0].created_at))
+        released.append(waiting[user].popleft())
+        if not waiting[user]:
+            del waiting[user]
+        active[user] = active.get(user, 0) + 1
+        total += 1
+    return released
+
+
+def _unclaim_statement(rows: List):
+    """Hold runs again that were claimed but couldn't be sent"""
+    return (
+        update(TaskStatus)
+        .where(TaskStatus.task_id.in_([row.task_id for row in rows]))
+        .values(dispatched_at=None)
+    )
+
+
+def _send(released: List) -> List:
+    """Send claimed runs to the broker; returns the ones that failed"""
+    failed = []
+    for row in released:
+        try:
+            dispatch_research(row.task_id, row.industry, TaskTypeEnum.MANUAL)
+        except Exception as exc:
+            print(f"--- FAILED TO DISPATCH {row.task_id}: {exc} ---")
+            failed.append(row)
+    if len(released) > len(failed):
+        print(f"--- RELEASED {len(released) - len(failed)} HELD RESEARCH TASKS ---")
+    return failed
+
+
+def release_held_research() -> List:
+    """Dispatch held manual runs into free slots (Celery workers and beat)"""
+    with Session(engine) as session:
+        if not session.exec(_held_statement().limit(1)).first():
+            return []
+
+    try:
+        with get_redis().lock(DISPATCH_LOCK, timeout=10, blocking_timeout=5):
+            with Session(engine) as session:
+                released = plan_dispatch(
+                    session.exec(_held_statement()).all(),
+                    dict(session.exec(_active_statement()).all())
+                )
+                if released:
+                    session.execute(_claim_statement(released))
+                    session.commit()
+    except LockError:
+        print("--- DISPATCH LOCK BUSY, HELD RESEARCH LEFT FOR THE NEXT PASS ---")
+        return []
+    failed = _send(released)
+    if failed:
+        with Session(engine) as session:
+            session.execute(_unclaim_statement(failed))
+            session.commit()
+    return [row for row in released if row not in failed]
+
+
+async def arelease_held_research(session: AsyncSession) -> List:
+    """release_held_research on the web app's async session"""
+    if not (await session.exec(_held_statement().limit(1))).first():
+        return []
+
+    try:
+        async with get_async_redis().lock(DISPATCH_LOCK, timeout=10, blocking_timeout=5):
+            released = plan_dispatch(
+                (await session.exec(_held_statement())).all(),
+                dict((await session.exec(_active_statement())).all())
+            )
+            if released:
+                await session.execute(_claim_statement(released))
+                await session.commit()
+    except LockError:
+        print("--- DISPATCH LOCK BUSY, HELD RESEARCH LEFT FOR THE NEXT PASS ---")
+        return []
+    # Celery's send_task is blocking
+    failed = await asyncio.to_thread(_send, released)
+    if failed:
+        await session.execute(_unclaim_statement(failed))
+        await session.commit()
+    return [row for row in released if row not in failed]
+
+
+def _ahead_statement(task: TaskStatus):
+    """Count the runs of the same type that will start before a PENDING task"""
+    dispatched = TaskStatus.dispatched_at
+    waiting = (
+        select(func.count())
+        .select_from(TaskStatus)
+        .where(TaskStatus.task_type == task.task_type)
+        .where(TaskStatus.status == TaskStatusEnum.PENDING)
+        .where(TaskStatus.id != task.id)
+    )
+    if task.dispatched_at is None:
+        # Held: behind everything on the broker and (approximately) older held requests
+        return waiting.where(or_(
+            dispatched >= _active_since(),
+            and_(dispatched.is_(None), TaskStatus.created_at < task.created_at)
+        ))
+    return waiting.where(dispatched >= _active_since()).where(dispatched < task.dispatched_at)
+
+
+def _running_statement(task_type: TaskTypeEnum):
+    return (
+        select(func.count())
+        .select_from(TaskStatus)
+        .where(TaskStatus.task_type == task_type)
+        .where(TaskStatus.status == TaskStatusEnum.PROCESSING)
+        .where(TaskStatus.dispatched_at >= _active_since())
+    )
+
+
+async def _average_duration(session: AsyncSession, task_type: TaskTypeEnum) -> Optional[float]:
+    """Mean run time (seconds) of recently completed runs of a task type"""
+    cached = _durations.get(task_type)
+    if cached is not None:
+        return cached[0]
+
+    statement = (
+        select(TaskStatus.started_at, TaskStatus.completed_at)
+        .where(TaskStatus.task_type == task_type)
+        .where(TaskStatus.status == TaskStatusEnum.COMPLETED)
+        .where(TaskStatus.started_at.is_not(None))
+        .order_by(TaskStatus.completed_at.desc())
+        .limit(settings.queue_eta_sample_size)
+    )
+    rows = (await session.exec(statement)).all()
+    durations = [(completed - started).total_seconds() for started, completed in rows]
+    average = sum(durations) / len(durations) if durations else None
+    _durations.set(task_type, (average,))
+    return average
+
+
+async def queue_status(session: AsyncSession, task: TaskStatus) -> dict:
+    """
+    Queue position (1 = next to start; None once running) and estimated
+    seconds until the task completes (None without recent runs to go by)
+    """
+    if task.is_completed:
+        return {"queue_position": None, "eta_seconds": None}
+
+    average = await _average_duration(session, task.task_type)
+    if task.status == TaskStatusEnum.PROCESSING:
+        elapsed = (datetime.utcnow() - (task.started_at or task.created_at)).total_seconds()
+        eta = None if average is None else round(max(average - elapsed, 0))
+        return {"queue_position": None, "eta_seconds": eta}
+
+    ahead = (await session.exec(_ahead_statement(task))).one()
+    eta = None
+    if average is not None:
+        # While runs are waiting, every slot serving the queue is busy, so
+        # the running count approximates the queue's capacity
+        slots = max((await session.exec(_running_statement(task.task_type))).one(), 1)
+        eta = round(average * (ahead // slots + 1))
+    return {"queue_position": ahead + 1, "eta_seconds": eta}
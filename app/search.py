@@ -0,0 +1,136 @@
+"""
+Full-text search over report summaries and alerts
+
+Postgres keeps a generated, weighted ``search_vector`` tsvector column on
+supply_chain_reports with a GIN index; SQLite (local development) keeps an
+external-content FTS5 table synced by triggers. Both are maintained by the
+database on write, so searching never scans the reports themselves.
+
+The Postgres objects come from Alembic only (migration 0006 builds the index
+CONCURRENTLY); ensure_search_schema creates the SQLite ones for development
+databases made by create_db_and_tables.
+"""
+import re
+from typing import List, Tuple
+from markupsafe import Markup, escape
+from sqlalchemy import DateTime, text
+from sqlalchemy.engine import Connection
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Control characters delimit highlights so snippets can be escaped before marking up
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+SQLITE_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS report_search USING fts5(
+        industry, executive_summary, critical_alerts,
+        content='supply_chain_reports', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS report_search_insert AFTER INSERT ON supply_chain_reports BEGIN
+        INSERT INTO report_search(rowid, industry, executive_summary, critical_alerts)
+        VALUES (new.id, new.industry, new.executive_summary, new.critical_alerts);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS report_search_delete AFTER DELETE ON supply_chain_reports BEGIN
+        INSERT INTO report_search(report_search, rowid, industry, executive_summary, critical_alerts)
+        VALUES ('delete', old.id, old.industry, old.executive_summary, old.critical_alerts);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS report_search_update AFTER UPDATE ON supply_chain_reports BEGIN
+        INSERT INTO report_search(report_search, rowid, industry, executive_summary, critical_alerts)
+        VALUES ('delete', old.id, old.industry, old.executive_summary, old.critical_alerts);
+        INSERT INTO report_search(rowid, industry, executive_summary, critical_alerts)
+        VALUES (new.id, new.industry, new.executive_summary, new.critical_alerts);
+    END
+    """,
+]
+
+POSTGRES_QUERY = """
+    SELECT page.id, page.industry, page.fragility_score, page.created_at, page.rank,
+           ts_headline(
+               'english',
+               r.executive_summary || ' ' || coalesce(r.critical_alerts::text, ''),
+               page.query,
+               'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxWords=35, MinWords=15, MaxFragments=2'
+           ) AS snippet
+    FROM (
+        SELECT r.id, r.industry, r.fragility_score, r.created_at, q AS query,
+               ts_rank_cd(r.search_vector, q) AS rank
+        FROM supply_chain_reports r, websearch_to_tsquery('english', :query) q
+        WHERE r.search_vector @@ q
+        ORDER BY rank DESC, r.id DESC
+        LIMIT :limit OFFSET :offset
+    ) page
+    JOIN supply_chain_reports r ON r.id = page.id
+    ORDER BY page.rank DESC, page.id DESC
+"""
+
+SQLITE_QUERY = """
+    SELECT r.id, r.industry, r.fragility_score, r.created_at,
+           -bm25(report_search, 4.0, 1.0, 1.0) AS rank,
+           snippet(report_search, -1, char(2), char(3), '…', 24) AS snippet
+    FROM report_search
+    JOIN supply_chain_reports r ON r.id = report_search.rowid
+    WHERE report_search MATCH :query
+    ORDER BY rank DESC, r.id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def ensure_search_schema(conn: Connection):
+    """Create the SQLite full-text index (idempotent) and index existing reports; no-op elsewhere"""
+    if conn.dialect.name == "sqlite":
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'report_search'")).first()
+        for statement in SQLITE_SCHEMA:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text("INSERT INTO report_search(report_search) VALUES ('rebuild')"))
+
+
+def _fts5_query(query: str) -> str:
+    """Quote each term so user input can't hit FTS5 query syntax; terms are ANDed"""
+    terms = re.findall(r"\w+", query)
+    return " ".join('"' + term + '"' for term in terms)
+
+
+def highlight(snippet: str) -> Markup:
+    """Escape a snippet and turn the highlight delimiters into <mark> tags"""
+    escaped = str(escape(snippet or ""))
+    return Markup(
+        escaped.replace(HIGHLIGHT_START, '<mark class="bg-yellow-200 dark:bg-yellow-700/60 rounded px-0.5">')
+        .replace(HIGHLIGHT_END, "</mark>")
+    )
+
+
+async def search_reports(session: AsyncSession, query: str, limit: int, offset: int = 0) -> Tuple[List[dict], bool]:
+    """Ranked matches for a query; returns (page of results, whether more exist)"""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        statement, params = POSTGRES_QUERY, {"query": query}
+    elif dialect == "sqlite":
+        match = _fts5_query(query)
+        if not match:
+            return [], False
+        statement, params = SQLITE_QUERY, {"query": match}
+    else:
+        raise NotImplementedError(f"Full-text search is not implemented for {dialect}")
+
+    statement = text(statement).columns(created_at=DateTime)
+    rows = (await session.execute(statement, {**params, "limit": limit + 1, "offset": offset})).all()
+    results = [
+        {
+            "id": row.id,
+            "industry": row.industry,
+            "fragility_score": row.fragility_score,
+            "created_at": row.created_at,
+            "rank": row.rank,
+            "snippet": highlight(row.snippet)
+        }
+        for row in rows[:limit]
+    ]
+    return results, len(rows) > limit
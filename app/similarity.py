@@ -0,0 +1,218 @@
+"""
+Report similarity over a local vector index
+
+Reports are vectorized by an Embedder. The default HashingEmbedder is
+lexical, not semantic: word unigrams and bigrams of the industry, executive
+summary and critical alerts are hashed into a fixed number of dimensions,
+weighted sublinearly and L2-normalized, so reports score as similar when
+they share wording. A model-backed embedder can replace it by subclassing
+Embedder; rows record the embedder's model name and the index only loads
+rows written by the current one.
+
+Vectors are stored int8-quantized in report_embeddings. Each web process
+keeps them in a flat numpy matrix that is extended incrementally (reports
+are write-once) and scanned in vectorized chunks.
+"""
+import asyncio
+import hashlib
+import re
+from datetime import datetime
+from typing import List, Optional
+import numpy as np
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import get_settings
+from app.models import ReportEmbedding, SupplyChainReport
+
+settings = get_settings()
+
+SEARCH_CHUNK_ROWS = 4096
+
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from has have in into is it its of on or that the their "
+    "there these this to was were will with which while within than over under across more most".split()
+)
+
+
+def _bucket(feature: str, dim: int) -> tuple:
+    """Hash a feature to (index, sign); the sign keeps collisions unbiased"""
+    digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+
+def _vectorize(features: List[str], dim: int) -> np.ndarray:
+    """Hash features into an L2-normalized float32 vector with sublinear counts"""
+    counts: dict = {}
+    for feature in features:
+        counts[feature] = counts.get(feature, 0) + 1
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, count in counts.items():
+        index, sign = _bucket(feature, dim)
+        vector[index] += sign * (1.0 + np.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class Embedder:
+    """Turns report text into unit vectors of a fixed size"""
+
+    model: str
+    dim: int
+
+    def embed(self, text: str) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """Lexical vectors from hashed word unigrams and bigrams"""
+
+    model = "hashing-uni-bigram-v1"
+    dim = 512
+
+    def embed(self, text: str) -> np.ndarray:
+        tokens = [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+        bigrams = [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        return _vectorize(tokens + bigrams, self.dim)
+
+
+embedder: Embedder = HashingEmbedder()
+
+
+def industry_trigrams(industry: str) -> np.ndarray:
+    """Character-trigram vector of an industry name ("Automotive" ~ "Automotive Parts"), for spelling-level matches"""
+    name = f"  {' '.join(industry.lower().split())} "
+    return _vectorize([name[i:i + 3] for i in range(len(name) - 2)], 256)
+
+
+def report_text(report: SupplyChainReport) -> str:
+    """Text that represents a report in the index"""
+    return "\n".join([report.industry, report.executive_summary, *(report.critical_alerts or [])])
+
+
+def quantize(vector: np.ndarray) -> bytes:
+    """Store a unit vector as int8 (components lie in [-1, 1])"""
+    return np.clip(np.rint(vector * 127), -127, 127).astype(np.int8).tobytes()
+
+
+def report_embedding(report: SupplyChainReport) -> ReportEmbedding:
+    """Build the embedding row for a saved report"""
+    return ReportEmbedding(
+        report_id=report.id,
+        industry=report.industry,
+        model=embedder.model,
+        vector=quantize(embedder.embed(report_text(report))),
+        created_at=report.created_at
+    )
+
+
+class ReportIndex:
+    """Flat int8 matrix of report vectors, refreshed incrementally from the database"""
+
+    def __init__(self):
+        # (report ids, int8 vectors, industries, created_at), replaced as a whole on refresh
+        self._snapshot = (np.zeros(0, dtype=np.int64), np.zeros((0, embedder.dim), dtype=np.int8), [], [])
+        self._lock = asyncio.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self._snapshot[0])
+
+    async def refresh(self, session: AsyncSession):
+        """Load embeddings written since the last refresh"""
+        async with self._lock:
+            ids, vectors, industries, created_at = self._snapshot
+            statement = (
+                select(ReportEmbedding)
+                .where(ReportEmbedding.report_id > (int(ids[-1]) if len(ids) else 0))
+                .where(ReportEmbedding.model == embedder.model)
+                .order_by(ReportEmbedding.report_id)
+            )
+            rows = (await session.exec(statement)).all()
+            if not rows:
+                return
+            new_vectors = np.frombuffer(b"".join(row.vector for row in rows), dtype=np.int8)
+            self._snapshot = (
+                np.concatenate([ids, np.array([row.report_id for row in rows], dtype=np.int64)]),
+                np.concatenate([vectors, new_vectors.reshape(len(rows), embedder.dim)]),
+                industries + [row.industry for row in rows],
+                created_at + [row.created_at for row in rows]
+            )
+
+    @staticmethod
+    def _scores(vectors: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every row to the query, computed in chunks"""
+        query = query.astype(np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-6)
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), SEARCH_CHUNK_ROWS):
+            chunk = vectors[start:start + SEARCH_CHUNK_ROWS].astype(np.float32)
+            norms = np.maximum(np.linalg.norm(chunk, axis=1), 1e-6)
+            scores[start:start + len(chunk)] = chunk @ query / norms
+        return scores
+
+    async def similar_to_report(self, session: AsyncSession, report_id: int, limit: int = 5) -> List[dict]:
+        """Past reports closest to an indexed report"""
+        await self.refresh(session)
+        ids, vectors, industries, created_at = self._snapshot
+        position = int(np.searchsorted(ids, report_id))
+        if position >= len(ids) or ids[position] != report_id:
+            return []
+
+        scores = await asyncio.to_thread(self._scores, vectors, vectors[position])
+        scores[position] = -1
+        limit = min(limit, len(scores) - 1)
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        return [
+            {
+                "report_id": int(ids[i]),
+                "industry": industries[i],
+                "created_at": created_at[i],
+                "score": round(float(scores[i]), 3)
+            }
+            for i in top[np.argsort(-scores[top])]
+            if scores[i] >= settings.similar_reports_min_score
+        ]
+
+    async def similar_recent_industry(self, session: AsyncSession, industry: str, since: datetime) -> Optional[dict]:
+        """
+        Most recent report for another industry whose name is spelled close to ``industry``
+
+        Names are compared by character trigrams, so this catches variants
+        like "Automotive Parts" but not synonyms. Exact matches are left to the regular deduplication; only scores above
+        ``research_similarity_min_score`` are returned.
+        """
+        await self.refresh(session)
+        ids, _, industries, created_at = self._snapshot
+        industry_key = industry.strip().lower()
+
+        # Reports are indexed in id order, so recent ones are at the end
+        latest = {}
+        for position in range(len(ids) - 1, -1, -1):
+            if created_at[position] < since:
+                break
+            name = industries[position].strip().lower()
+            if name != industry_key:
+                latest.setdefault(name, position)
+        if not latest:
+            return None
+
+        positions = list(latest.values())
+        names = np.stack([industry_trigrams(industries[position]) for position in positions])
+        scores = names @ industry_trigrams(industry)
+        best = int(np.argmax(scores))
+        if scores[best] < settings.research_similarity_min_score:
+            return None
+        position = positions[best]
+        return {
+            "report_id": int(ids[position]),
+            "industry": industries[position],
+            "created_at": created_at[position],
+            "score": round(float(scores[best]), 3)
+        }
+
+
+report_index = ReportIndex()
@@ -1,6 +1,15 @@
+import asyncio
+import os
+import random
+import time
+from uuid import UUID
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_shutdown
+from kombu import Queue
 from app.config import get_settings
+from app.dispatch import QUEUES, TASK_QUEUES
+from app.models import TaskTypeEnum
 
 settings = get_settings()
 
@@ -20,6 +29,14 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # One queue per task type; a worker started without -Q consumes them all,
+    # dedicated workers keep interactive runs clear of the scheduled batch
+    task_queues=[Queue(name) for name in QUEUES],
+    task_default_queue=TASK_QUEUES[TaskTypeEnum.MANUAL],
+    task_routes={
+        'app.tasks.scheduled_research_task': {'queue': TASK_QUEUES[TaskTypeEnum.SCHEDULED]},
+        'app.tasks.run_research_batch_task': {'queue': TASK_QUEUES[TaskTypeEnum.SCHEDULED]},
+    },
 )
 
 # Celery beat schedule for periodic tasks
@@ -28,70 +45,253 @@ celery_app.conf.beat_schedule = {
         'task': 'app.tasks.scheduled_research_task',
         'schedule': crontab(hour=9, minute=0),  # 9 AM daily
     },
+    # Catch-up pass for held manual research (normally released as runs finish)
+    'release-held-research': {
+        'task': 'app.tasks.release_held_research_task',
+        'schedule': 60.0,
+    },
+}
+
+
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    """Serve the worker's Prometheus metrics (agent, providers, database writes)"""
+    if settings.metrics_enabled and settings.worker_metrics_port:
+        from app.metrics import start_metrics_server
+        start_metrics_server(settings.worker_metrics_port)
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    """Drop a prefork child's live gauges from the multiprocess metrics directory"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+# Progress reported once each graph node finishes
+NODE_PROGRESS = {
+    "researcher": 40,
+    "compactor": 50,
+    "analyst": 90,
+}
+
+
+# Retry policy per error class: (base delay seconds, max retries). Matched on
+# class names so provider SDKs don't need importing here.
+RETRY_POLICIES = {
+    "rate_limit": (30, 5),
+    "transient": (5, 4),
+    "invalid_output": (10, 1),
+    "default": (15, 3),
 }
 
+RATE_LIMIT_ERRORS = {"ResourceExhausted", "TooManyRequests", "RateLimitError", "UsageLimitExceededError"}
+TRANSIENT_ERRORS = {
+    "TimeoutError", "ConnectionError", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+    "OperationalError", "ConnectTimeout", "ReadTimeout", "RemoteDisconnected"
+}
+INVALID_OUTPUT_ERRORS = {"ValidationError", "OutputParserException", "JSONDecodeError"}
+
+
+def classify_error(exc: Exception) -> str:
+    """Map an exception onto a retry policy name"""
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if names & RATE_LIMIT_ERRORS or "429" in str(exc):
+        return "rate_limit"
+    if names & TRANSIENT_ERRORS:
+        return "transient"
+    if names & INVALID_OUTPUT_ERRORS:
+        return "invalid_output"
+    return "default"
+
+
+def retry_countdown(error_class: str, retries: int) -> float:
+    """Exponential backoff with equal jitter, capped at task_retry_max_delay_seconds"""
+    base, _ = RETRY_POLICIES[error_class]
+    delay = min(settings.task_retry_max_delay_seconds, base * 2 ** retries)
+    return delay / 2 + random.uniform(0, delay / 2)
+
 
-@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
+@celery_app.task(bind=True)
 def run_research_task(self, task_id: str, industry: str):
     """
     Celery task for running supply chain research asynchronously
     
+    The graph checkpoints after every node under thread_id = task_id, so a
+    retry resumes after the last completed node rather than starting over.
+    With research_async_concurrency set, the graph runs on the worker's
+    event loop so one process overlaps many runs.
+    
     Args:
         task_id: UUID string of the TaskStatus record
         industry: Industry to research
     """
-    from datetime import datetime
+    from app.event_loop import run_coroutine
+    from app.progress import ProgressReporter
+    
+    reporter = ProgressReporter(task_id, industry)
+    try:
+        # Update to processing
+        if not reporter.start(progress=10):
+            return {'task_id': task_id, 'status': 'CANCELLED', 'error': 'Task not found'}
+        
+        if settings.research_async_concurrency > 0:
+            # The threads pool (-P threads) doesn't enforce time limits, so bound the run here
+            final_state = run_coroutine(
+                _arun_graph(reporter, task_id, industry),
+                timeout=celery_app.conf.task_soft_time_limit
+            )
+        else:
+            final_state = _run_graph(reporter, task_id, industry)
+        report_id = _save_report(reporter, final_state)
+        
+        _discard_checkpoints(task_id)
+        _release_held()
+        return {
+            'task_id': task_id,
+            'status': 'COMPLETED',
+            'report_id': report_id,
+            'industry': industry
+        }
+        
+    except Exception as exc:
+        error_class = classify_error(exc)
+        _, max_retries = RETRY_POLICIES[error_class]
+        retries = self.request.retries
+        if retries >= max_retries:
+            _mark_failed(reporter, exc)
+            _discard_checkpoints(task_id)
+            _release_held()
+            raise
+        
+        countdown = retry_countdown(error_class, retries)
+        print(f"--- RESEARCH {industry} FAILED ({error_class}), RETRY {retries + 1}/{max_retries} IN {countdown:.0f}s ---")
+        try:
+            reporter.retrying(exc, retries + 1, countdown)
+        except Exception as report_exc:
+            print(f"--- FAILED TO RECORD RETRY: {report_exc} ---")
+        # Retries wait on their own queue so backoff doesn't delay fresh requests
+        raise self.retry(
+            exc=exc,
+            countdown=countdown,
+            max_retries=max_retries,
+            queue=TASK_QUEUES[TaskTypeEnum.RETRY]
+        )
+
+
+def _discard_checkpoints(task_id: str):
+    """Drop a finished task's checkpoints (best effort; they only serve retries)"""
+    from app.checkpoints import adelete_checkpoints, delete_checkpoints
+    from app.event_loop import run_coroutine
+    try:
+        if settings.research_async_concurrency > 0:
+            run_coroutine(adelete_checkpoints(task_id))
+        else:
+            delete_checkpoints(task_id)
+    except Exception as exc:
+        print(f"--- FAILED TO DELETE CHECKPOINTS FOR {task_id}: {exc} ---")
+
+
+def _release_held():
+    """Hand a freed slot to held manual research (best effort; beat catches up)"""
+    from app.scheduler import release_held_research
+    try:
+        release_held_research()
+    except Exception as exc:
+        print(f"--- FAILED TO RELEASE HELD RESEARCH: {exc} ---")
+
+
+def _resume_point(checkpoint, industry: str):
+    """(state so far, graph input) for a task's latest checkpoint; input None resumes it"""
+    if checkpoint.next:
+        print(f"--- RESUMING {industry} AT {', '.join(checkpoint.next)} ---")
+        return dict(checkpoint.values), None
+    
+    from app.agent import initial_state
+    state = dict(initial_state(industry))
+    return state, state
+
+
+def _apply_stream_chunk(reporter, final_state: dict, mode: str, chunk: dict):
+    """Turn node completions and streamed analyst output into progress updates"""
+    if mode == "updates":
+        for node, update in chunk.items():
+            reporter.end_stage(node)
+            final_state.update(update or {})
+            reporter.update(NODE_PROGRESS.get(node, reporter.progress))
+    elif chunk.get("stage") == "researcher":
+        reporter.update(10 + 30 * chunk["completed"] // chunk["total"])
+    elif chunk.get("stage") == "analyst":
+        fraction = min(1.0, chunk["generated_chars"] / settings.analyst_expected_output_chars)
+        reporter.update(50 + int(40 * fraction), chunk["summary"] or None)
+
+
+def _run_graph(reporter, task_id: str, industry: str) -> dict:
+    """Run (or resume) the research graph synchronously and return its final state"""
+    from app.agent import get_research_app
+    from app.checkpoints import thread_config
+    
+    research_app = get_research_app()
+    config = thread_config(task_id)
+    checkpoint = research_app.get_state(config)
+    if checkpoint.values and not checkpoint.next:
+        # The graph already finished; an earlier attempt failed while saving
+        return dict(checkpoint.values)
+    
+    final_state, graph_input = _resume_point(checkpoint, industry)
+    reporter.begin_stages()
+    for mode, chunk in research_app.stream(graph_input, config, stream_mode=["updates", "custom"]):
+        _apply_stream_chunk(reporter, final_state, mode, chunk)
+    return final_state
+
+
+async def _arun_graph(reporter, task_id: str, industry: str) -> dict:
+    """_run_graph on the worker's event loop, with async nodes and checkpointer"""
+    from app.agent import get_async_research_app
+    from app.checkpoints import thread_config
+    
+    research_app = await get_async_research_app()
+    config = thread_config(task_id)
+    checkpoint = await research_app.aget_state(config)
+    if checkpoint.values and not checkpoint.next:
+        return dict(checkpoint.values)
+    
+    final_state, graph_input = _resume_point(checkpoint, industry)
+    reporter.begin_stages()
+    async for mode, chunk in research_app.astream(graph_input, config, stream_mode=["updates", "custom"]):
+        # Progress writes are blocking Redis/database calls
+        await asyncio.to_thread(_apply_stream_chunk, reporter, final_state, mode, chunk)
+    return final_state
+
+
+def _save_report(reporter, final_state) -> int:
+    """
+    Create the report for a finished agent run and complete its task
+    
+    The task row gets its report_id in the report's transaction, so a retry
+    after a failure past that point only completes the task.
+    """
+    from sqlalchemy import update
     from sqlmodel import Session, select
     from app.database import engine
-    from app.models import TaskStatus, SupplyChainReport, TaskStatusEnum
-    from app.agent import supply_chain_app
+    from app.analytics import record_report
+    from app.metrics import DB_COMMIT_SECONDS
+    from app.models import SupplyChainReport, TaskStatus
+    from app.reports import report_details, warm_report_html
+    from app.similarity import report_embedding
     
-    try:
-        with Session(engine) as session:
-            # Get task status
-            statement = select(TaskStatus).where(TaskStatus.task_id == task_id)
-            task_status = session.exec(statement).first()
-            
-            if not task_status:
-                return {'task_id': task_id, 'status': 'CANCELLED', 'error': 'Task not found'}
-            
-            # Update to processing
-            task_status.status = TaskStatusEnum.PROCESSING
-            task_status.started_at = datetime.utcnow()
-            task_status.progress = 10
-            session.add(task_status)
-            session.commit()
-            
-            # Update progress
-            task_status.progress = 25
-            session.add(task_status)
-            session.commit()
-            
-            # Initial state for LangGraph
-            initial_state = {
-                "industry": industry,
-                "raw_data": [],
-                "sources": [],
-                "risk_report": "",
-                "critical_alerts": [],
-                "fragility_score": 0,
-                "risk_metrics": []
-            }
-            
-            task_status.progress = 50
-            session.add(task_status)
-            session.commit()
-            
-            # Run the agent
-            final_state = supply_chain_app.invoke(initial_state)
-            
-            task_status.progress = 90
-            session.add(task_status)
-            session.commit()
-            
-            # Create report
+    started = time.monotonic()
+    # expire_on_commit=False keeps the report's fields loaded for pre-rendering
+    with Session(engine, expire_on_commit=False) as session:
+        report_id = session.exec(
+            select(TaskStatus.report_id).where(TaskStatus.task_id == UUID(reporter.task_id))
+        ).first()
+        if report_id is not None:
+            print(f"--- REPORT {report_id} FOR {reporter.industry} ALREADY SAVED, COMPLETING TASK ---")
+        else:
             report = SupplyChainReport(
-                industry=industry,
+                industry=reporter.industry,
                 fragility_score=final_state["fragility_score"],
                 executive_summary=final_state["risk_report"],
                 critical_alerts=final_state["critical_alerts"],
@@ -99,65 +299,163 @@ def run_research_task(self, task_id: str, industry: str):
                 sources=final_state.get("sources", [])
             )
             session.add(report)
-            session.commit()
-            session.refresh(report)
-            
-            # Update task status
-            task_status.status = TaskStatusEnum.COMPLETED
-            task_status.progress = 100
-            task_status.completed_at = datetime.utcnow()
-            task_status.report_id = report.id
-            session.add(task_status)
-            session.commit()
-            
-            return {
-                'task_id': task_id,
-                'status': 'COMPLETED',
-                'report_id': report.id,
-                'industry': industry
-            }
+            session.flush()
+            report_id = report.id
+            session.add_all(report_details(report))
+            session.add(report_embedding(report))
+            record_report(session, report)
+            session.execute(
+                update(TaskStatus)
+                .where(TaskStatus.task_id == UUID(reporter.task_id))
+                .values(report_id=report_id)
+            )
+            with DB_COMMIT_SECONDS.labels("save_report").time():
+                session.commit()
+            reporter.record_stage("save", time.monotonic() - started)
             
+            # Render once here so the first dashboard view is already a cache hit
+            warm_report_html(report)
+    
+    reporter.complete(
+        report_id,
+        context_tokens_raw=final_state.get("context_tokens_raw"),
+        context_tokens_compacted=final_state.get("context_tokens_compacted")
+    )
+    return report_id
+
+
+def _mark_failed(reporter, exc: Exception):
+    """Record a task failure (best effort)"""
+    try:
+        reporter.fail(exc)
+    except Exception as report_exc:
+        print(f"--- FAILED TO RECORD TASK FAILURE: {report_exc} ---")
+
+
+@celery_app.task(bind=True)
+def run_research_batch_task(self, items: list):
+    """
+    Celery task running research for several industries in one agent pass
+    
+    Args:
+        items: List of [task_id, industry] pairs for existing TaskStatus records
+    """
+    from datetime import datetime
+    from sqlalchemy import func, update
+    from app.database import engine
+    from app.models import TaskStatus, TaskStatusEnum
+    from app.agent import run_batch
+    from app.events import publish_task_event
+    from app.progress import ProgressReporter
+    
+    # One UPDATE moves the whole batch to PROCESSING
+    with engine.begin() as conn:
+        conn.execute(
+            update(TaskStatus)
+            .where(TaskStatus.task_id.in_([UUID(task_id) for task_id, _ in items]))
+            .values(
+                status=TaskStatusEnum.PROCESSING,
+                # Retries keep the first attempt's start time
+                started_at=func.coalesce(TaskStatus.started_at, datetime.utcnow()),
+                progress=25
+            )
+        )
+    reporters = [ProgressReporter(task_id, industry) for task_id, industry in items]
+    for reporter in reporters:
+        reporter.progress = 25
+        publish_task_event(reporter.task_id, TaskStatusEnum.PROCESSING.value, 25, reporter.industry)
+    
+    try:
+        results = run_batch([reporter.industry for reporter in reporters])
     except Exception as exc:
-        # Update task to failed
+        results = [exc] * len(items)
+    
+    summary = []
+    failures = []
+    for reporter, result in zip(reporters, results):
+        outcome = {'task_id': reporter.task_id, 'status': 'FAILED', 'industry': reporter.industry}
+        if isinstance(result, Exception):
+            failures.append((reporter, result))
+        else:
+            try:
+                outcome.update(status='COMPLETED', report_id=_save_report(reporter, result))
+            except Exception as exc:
+                failures.append((reporter, exc))
+        summary.append(outcome)
+    
+    if not failures:
+        return summary
+    
+    # Failed industries are retried together, with the backoff of the first failure's class
+    error_class = classify_error(failures[0][1])
+    _, max_retries = RETRY_POLICIES[error_class]
+    retries = self.request.retries
+    if retries >= max_retries:
+        for reporter, exc in failures:
+            _mark_failed(reporter, exc)
+        return summary
+    
+    countdown = retry_countdown(error_class, retries)
+    print(f"--- BATCH: {len(failures)} INDUSTRIES FAILED ({error_class}), RETRY {retries + 1}/{max_retries} IN {countdown:.0f}s ---")
+    for reporter, exc in failures:
         try:
-            with Session(engine) as session:
-                statement = select(TaskStatus).where(TaskStatus.task_id == task_id)
-                task_status = session.exec(statement).first()
-                if task_status:
-                    task_status.status = TaskStatusEnum.FAILED
-                    task_status.error_message = str(exc)
-                    task_status.completed_at = datetime.utcnow()
-                    session.add(task_status)
-                    session.commit()
-        except:
-            pass
-        raise
+            reporter.retrying(exc, retries + 1, countdown)
+        except Exception as report_exc:
+            print(f"--- FAILED TO RECORD RETRY: {report_exc} ---")
+    raise self.retry(
+        args=[[[reporter.task_id, reporter.industry] for reporter, _ in failures]],
+        exc=failures[0][1],
+        countdown=countdown,
+        max_retries=max_retries
+    )
 
 
 @celery_app.task
 def scheduled_research_task():
     """Scheduled task to run research for key industries"""
-    from uuid import uuid4
     from datetime import datetime
-    from sqlmodel import Session, select
+    from uuid import uuid4
+    from celery import group
+    from sqlmodel import Session
     from app.database import engine
     from app.models import TaskStatus, TaskTypeEnum, TaskStatusEnum
+    from app.events import publish_task_event
     
-    industries = ["Technology", "Automotive", "Pharmaceuticals"]
+    industries = settings.scheduled_industries
     
+    # Insert every task row in a single transaction
+    items = [[str(uuid4()), industry] for industry in industries]
+    now = datetime.utcnow()
     with Session(engine) as session:
-        for industry in industries:
-            task_id = str(uuid4())
-            task_status = TaskStatus(
-                task_id=task_id,
+        session.add_all([
+            TaskStatus(
+                task_id=UUID(task_id),
                 task_type=TaskTypeEnum.SCHEDULED,
                 industry=industry,
-                status=TaskStatusEnum.PENDING
+                status=TaskStatusEnum.PENDING,
+                dispatched_at=now
             )
-            session.add(task_status)
-            session.commit()
-            
-            # Queue the research task
-            run_research_task.delay(task_id, industry)
+            for task_id, industry in items
+        ])
+        session.commit()
+    
+    for task_id, industry in items:
+        publish_task_event(task_id, TaskStatusEnum.PENDING.value, 0, industry)
+    
+    # Queue one batch task per chunk of industries
+    batch_size = max(1, settings.research_batch_size)
+    group(
+        run_research_batch_task.s(items[i:i + batch_size])
+        for i in range(0, len(items), batch_size)
+    ).apply_async()
     
     return f"Scheduled research for {len(industries)} industries"
+
+
+@celery_app.task
+def release_held_research_task():
+    """Periodic pass releasing held manual research into free slots"""
+    from app.scheduler import release_held_research
+    
+    released = release_held_research()
+    return f"Released {len(released)} held research tasks"
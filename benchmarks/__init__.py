@@ -0,0 +1 @@
+"""Load and startup benchmarks (run with ``python -m benchmarks.<name>``)"""
@@ -0,0 +1,59 @@
+import statistics
+import time
+from typing import List
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - benchmark-only dependency
+    httpx = None
+
+
+def require_httpx():
+    """Exit with a helpful message when httpx is not installed"""
+    if httpx is None:
+        raise SystemExit("These benchmarks need httpx: pip install httpx")
+    return httpx
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def login(client, username: str, password: str, email: str = ""):
+    """Log in (signing up first if needed) so the client carries a session cookie"""
+    response = await client.post("/auth/login", data={"username": username, "password": password})
+    if response.status_code == 401:
+        response = await client.post(
+            "/auth/signup",
+            data={"username": username, "email": email or f"{username}@example.com", "password": password}
+        )
+    response.raise_for_status()
+
+
+def report(title: str, latencies: List[float], errors: int, elapsed: float, unit: str = "requests", rate: str = "req/s"):
+    """Print a throughput / latency summary"""
+    total = len(latencies) + errors
+    print(f"\n{title}")
+    print(f"  {unit + ':':<11} {total} ({errors} errors) in {elapsed:.1f}s")
+    print(f"  throughput: {len(latencies) / elapsed:.1f} {rate}")
+    if latencies:
+        print(f"  latency:    mean {statistics.mean(latencies) * 1000:.1f} ms, "
+              f"p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+              f"p95 {percentile(latencies, 95) * 1000:.1f} ms, "
+              f"p99 {percentile(latencies, 99) * 1000:.1f} ms")
+
+
+class Timer:
+    """Context manager recording elapsed wall time"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
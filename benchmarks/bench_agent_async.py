@@ -0,0 +1,68 @@
+"""
+Research graph throughput: prefork-style sync runs vs. the async event loop
+
+Tavily and Gemini are replaced by the fake providers (app.providers) with a
+fixed latency, so the benchmark measures how many runs a worker overlaps
+rather than the providers. The sync side runs the graph's ``invoke`` in a
+pool of ``--processes`` forked processes (one run per process, like the prefork
+pool); the async side submits ``ainvoke`` from ``--concurrency`` threads to
+one background event loop (like the threads pool in async mode):
+
+    python -m benchmarks.bench_agent_async --runs 64 --processes 4 --concurrency 32
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks._common import Timer, report
+from app import agent
+from app.event_loop import run_coroutine
+from app.providers import install_fake_providers
+
+
+def install_fakes(search_latency: float, llm_latency: float):
+    """Swap the providers for latency-injected fakes and keep caches process-local"""
+    install_fake_providers(search_latency, llm_latency)
+    agent.search_cache.store.shared = False
+    agent.analyst_cache.shared = False
+
+
+def sync_run(industry: str) -> float:
+    start = time.perf_counter()
+    agent.get_supply_chain_app().invoke(agent.initial_state(industry))
+    return time.perf_counter() - start
+
+
+def async_run(industry: str) -> float:
+    start = time.perf_counter()
+    run_coroutine(agent.get_supply_chain_app().ainvoke(agent.initial_state(industry)))
+    return time.perf_counter() - start
+
+
+def main(args):
+    install_fakes(args.search_latency, args.llm_latency)
+
+    # Distinct industries so neither cache answers a run
+    sync_industries = [f"Sync Industry {i}" for i in range(args.runs)]
+    async_industries = [f"Async Industry {i}" for i in range(args.runs)]
+
+    with Timer() as timer:
+        with multiprocessing.get_context("fork").Pool(args.processes) as pool:
+            latencies = pool.map(sync_run, sync_industries, chunksize=1)
+    report(f"sync graph, {args.processes} prefork processes ({args.runs} runs)", latencies, 0, timer.elapsed, "runs", "runs/s")
+
+    with Timer() as timer:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            latencies = list(executor.map(async_run, async_industries))
+    report(f"async graph, 1 process x {args.concurrency} concurrent runs ({args.runs} runs)", latencies, 0, timer.elapsed, "runs", "runs/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=64)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--concurrency", type=int, default=agent.settings.research_async_concurrency or 32)
+    parser.add_argument("--search-latency", type=float, default=0.8, help="seconds per Tavily sub-query")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="seconds per analyst call")
+    main(parser.parse_args())
@@ -0,0 +1,73 @@
+"""
+Web process startup (import time) regression check
+
+Imports the web app in fresh interpreters under ``python -X importtime``
+and reports the median import time of the module plus its slowest direct
+imports. Fails (exit code 1) when a worker-only module is imported by the
+web tier, or when the median exceeds ``--budget-ms``:
+
+    python -m benchmarks.bench_import_time --module app.main --repeat 5 --budget-ms 2500
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+# Modules the web tier must not load at startup (agent, Celery and provider SDKs)
+WORKER_ONLY = ["app.agent", "app.tasks", "celery", "langgraph", "langchain_core", "langchain_google_genai", "tavily"]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module: str) -> tuple:
+    """({module: cumulative microseconds}, {module: nesting depth}) for one fresh import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative = {}
+    depths = {}
+    for match in LINE.finditer(result.stderr):
+        name = match.group(4)
+        cumulative[name] = int(match.group(2))
+        depths[name] = len(match.group(3))
+    return cumulative, depths
+
+
+def main(args):
+    totals = []
+    for _ in range(args.repeat):
+        cumulative, depths = measure(args.module)
+        totals.append(cumulative[args.module])
+
+    print(f"\nimport {args.module} x {args.repeat} fresh interpreters")
+    print(f"  total:   median {statistics.median(totals) / 1000:.0f} ms, "
+          f"min {min(totals) / 1000:.0f} ms, max {max(totals) / 1000:.0f} ms")
+    print("  slowest direct imports (last run):")
+    # importtime indents each nesting level by two spaces
+    direct = [name for name in cumulative if depths[name] == depths[args.module] + 2]
+    for name in sorted(direct, key=cumulative.get, reverse=True)[:args.top]:
+        print(f"    {cumulative[name] / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = [name for name in WORKER_ONLY if name in cumulative]
+    if loaded:
+        print(f"  FAIL: worker-only modules imported: {', '.join(loaded)}")
+        failed = True
+    if args.budget_ms and statistics.median(totals) / 1000 > args.budget_ms:
+        print(f"  FAIL: median import time above the {args.budget_ms} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail above this median (0 disables)")
+    main(parser.parse_args())
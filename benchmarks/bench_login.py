@@ -0,0 +1,73 @@
+"""
+Login burst benchmark
+
+Fires concurrent logins at ``/auth/login`` while a probe keeps calling
+``/health``. Before bcrypt was moved off the event loop the probe latency
+tracks the login queue; afterwards it stays flat and saturated logins get a
+fast 503 instead. Run once against each build:
+
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.bench_login --concurrency 50 --duration 20
+"""
+import argparse
+import asyncio
+import time
+from benchmarks._common import Timer, login, report, require_httpx
+
+
+async def login_loop(client, args, deadline, latencies, errors, rejected):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                "/auth/login",
+                data={"username": args.username, "password": args.password}
+            )
+            if response.status_code == 503:
+                rejected.append(1)
+                continue
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(1)
+
+
+async def probe_loop(client, deadline, latencies):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.05)
+
+
+async def main(args):
+    httpx = require_httpx()
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        # Make sure the account exists before the burst starts
+        await login(client, args.username, args.password)
+
+        login_latencies, errors, rejected, probe_latencies = [], [], [], []
+        with Timer() as timer:
+            deadline = time.perf_counter() + args.duration
+            await asyncio.gather(
+                probe_loop(client, deadline, probe_latencies),
+                *[
+                    login_loop(client, args, deadline, login_latencies, errors, rejected)
+                    for _ in range(args.concurrency)
+                ]
+            )
+
+    report(f"POST /auth/login x {args.concurrency} concurrent", login_latencies, len(errors), timer.elapsed)
+    print(f"  rejected:   {len(rejected)} (503, pool saturated)")
+    report("GET /health probe during the burst", probe_latencies, 0, timer.elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="bench")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))
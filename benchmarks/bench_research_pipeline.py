@@ -0,0 +1,156 @@
+"""
+End-to-end research pipeline benchmark on the fake providers
+
+Creates N task records and drives them through ``run_research_task`` with
+the offline providers (app.providers), so the numbers show our own overhead
+(graph, checkpoints, progress events, report writes) on top of a known,
+configurable provider latency. Task latency is measured from the task row's
+creation to its completion, and the run reports p50/p95/p99 and tasks/sec.
+
+``--mode eager`` runs the tasks in this process (``--concurrency`` at a
+time, through the same Celery task code) with the latency and failure rate
+given on the command line. ``--mode worker`` queues them on the broker for
+a running worker, which must use the fake providers too (configured through
+its FAKE_* environment):
+
+    RESEARCH_PROVIDER=fake celery -A app.tasks worker --loglevel=warning &
+    python -m benchmarks.bench_research_pipeline --mode worker --tasks 200
+
+Reports and task rows are written to DATABASE_URL (SQLite or Postgres);
+point it at a scratch database. An empty SQLite file is created on first
+run; migrate a Postgres database with ``alembic upgrade head`` first.
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from uuid import UUID, uuid4
+
+os.environ.setdefault("RESEARCH_PROVIDER", "fake")
+# SQL echo (DEBUG) would dominate the measurement
+os.environ.setdefault("DEBUG", "false")
+
+from sqlmodel import Session, select  # noqa: E402
+from benchmarks._common import Timer, report  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.database import create_db_and_tables, engine  # noqa: E402
+from app.models import TaskStatus, TaskStatusEnum, TaskTypeEnum  # noqa: E402
+from app.providers import install_fake_providers  # noqa: E402
+
+settings = get_settings()
+
+TERMINAL = {TaskStatusEnum.COMPLETED, TaskStatusEnum.FAILED, TaskStatusEnum.CANCELLED}
+
+
+def create_tasks(count: int) -> list:
+    """
+    Insert PENDING task rows for distinct industries (so no cache answers them)
+
+    The rows are dispatched directly, bypassing the fair-share limits.
+    """
+    run = uuid4().hex[:8]
+    items = [(uuid4(), f"Benchmark Industry {run}-{i}") for i in range(count)]
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        session.add_all([
+            TaskStatus(
+                task_id=task_id,
+                task_type=TaskTypeEnum.MANUAL,
+                industry=industry,
+                status=TaskStatusEnum.PENDING,
+                dispatched_at=now
+            )
+            for task_id, industry in items
+        ])
+        session.commit()
+    return [(str(task_id), industry) for task_id, industry in items]
+
+
+def run_eager(items: list, concurrency: int):
+    from app.tasks import celery_app, run_research_task
+
+    # Retries run inline too; only the final outcome lands on the task row
+    celery_app.conf.task_always_eager = True
+    celery_app.conf.task_eager_propagates = False
+    # Bind the tasks before the threads race to do it
+    celery_app.finalize()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda item: run_research_task.apply(args=list(item)), items))
+
+
+def run_worker(items: list, timeout: float, poll_seconds: float = 0.5):
+    from app.dispatch import dispatch_research
+
+    for task_id, industry in items:
+        dispatch_research(task_id, industry)
+
+    pending = {task_id for task_id, _ in items}
+    deadline = time.perf_counter() + timeout
+    while pending and time.perf_counter() < deadline:
+        time.sleep(poll_seconds)
+        pending -= {str(task_id) for task_id in _finished(list(pending))}
+    if pending:
+        print(f"--- {len(pending)} TASKS UNFINISHED AFTER {timeout:.0f}s ---")
+
+
+def _finished(task_ids: list) -> list:
+    with Session(engine) as session:
+        statement = (
+            select(TaskStatus.task_id)
+            .where(TaskStatus.task_id.in_([UUID(task_id) for task_id in task_ids]))
+            .where(TaskStatus.status.in_(TERMINAL))
+        )
+        return session.exec(statement).all()
+
+
+def collect(items: list) -> tuple:
+    """(latencies of completed tasks, tasks that didn't complete, first creation to last completion, retries)"""
+    with Session(engine) as session:
+        rows = session.exec(
+            select(TaskStatus).where(TaskStatus.task_id.in_([UUID(task_id) for task_id, _ in items]))
+        ).all()
+    completed = [row for row in rows if row.status == TaskStatusEnum.COMPLETED]
+    latencies = [(row.completed_at - row.created_at).total_seconds() for row in completed]
+    retries = sum(row.retry_count for row in rows)
+    span = (
+        (max(row.completed_at for row in completed) - min(row.created_at for row in rows)).total_seconds()
+        if completed else 0.0
+    )
+    return latencies, len(items) - len(completed), span, retries
+
+
+def main(args):
+    create_db_and_tables()
+    items = create_tasks(args.tasks)
+
+    with Timer() as timer:
+        if args.mode == "eager":
+            install_fake_providers(args.search_latency, args.llm_latency, args.failure_rate, args.jitter)
+            run_eager(items, args.concurrency)
+        else:
+            run_worker(items, args.timeout)
+
+    latencies, errors, span, retries = collect(items)
+    if args.mode == "eager":
+        title = (
+            f"run_research_task, eager x {args.concurrency}, {engine.dialect.name} "
+            f"(search {args.search_latency}s, LLM {args.llm_latency}s, failure rate {args.failure_rate})"
+        )
+    else:
+        title = f"run_research_task, worker, {engine.dialect.name}"
+    report(title, latencies, errors, span or timer.elapsed, "tasks", "tasks/s")
+    print(f"  retries:    {retries}, wall time {timer.elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["eager", "worker"], default="eager")
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent tasks in eager mode")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for a worker")
+    parser.add_argument("--search-latency", type=float, default=settings.fake_search_latency_seconds)
+    parser.add_argument("--llm-latency", type=float, default=settings.fake_llm_latency_seconds)
+    parser.add_argument("--failure-rate", type=float, default=settings.fake_provider_failure_rate)
+    parser.add_argument("--jitter", type=float, default=settings.fake_provider_jitter)
+    main(parser.parse_args())
@@ -0,0 +1,54 @@
+"""
+Concurrent dashboard polling benchmark
+
+Simulates many open dashboards hitting ``/api/tasks`` at once and reports
+requests/sec and latency percentiles. Run it against a server started from
+the commit before the async database layer and again from this one to see
+the difference:
+
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.bench_task_polling --concurrency 200 --duration 30
+"""
+import argparse
+import asyncio
+import time
+from benchmarks._common import Timer, login, report, require_httpx
+
+
+async def poll(client, path: str, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(1)
+
+
+async def main(args):
+    httpx = require_httpx()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        await login(client, args.username, args.password)
+
+        latencies, errors = [], []
+        with Timer() as timer:
+            deadline = time.perf_counter() + args.duration
+            await asyncio.gather(*[
+                poll(client, args.path, deadline, latencies, errors)
+                for _ in range(args.concurrency)
+            ])
+
+    report(f"GET {args.path} x {args.concurrency} concurrent pollers", latencies, len(errors), timer.elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/tasks?status=COMPLETED")
+    parser.add_argument("--username", default="bench")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))